@@ -17,6 +17,15 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from app.travel_agent.graph import part_4_graph
+from app.travel_agent.tools.database import prepare_database
+from app.travel_agent.tools.retriever import get_retriever
+
+
+@st.cache_resource(show_spinner="Preparing travel database...")
+def warm_up():
+    # Runs once per server process; a stamped DB and a prebuilt FAQ index make this cheap.
+    get_retriever()
+    return prepare_database()
 
 
 def init_session_state():
@@ -120,6 +129,7 @@ st.subheader("Travel Assistant")
 st.caption("Your personal travel assistant for flight, car rental, and hotel queries.")
 st.caption("In this example the user has a flight booked form Paris to Basel.")
 init_session_state()
+warm_up()
 
 with st.expander("About this app"):
     st.write(
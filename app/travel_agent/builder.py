@@ -5,8 +5,11 @@ from pydantic import SecretStr
 from app.travel_agent.base_models import (CompleteOrEscalate, ToFlightBookingAssistant,
                          ToBookCarRental, ToHotelBookingAssistant, ToBookExcursion)
 
+from app.travel_agent.config import ANTHROPIC_BASE_URL, CONTEXT_TOKEN_BUDGET
+from app.travel_agent.context import ConversationWindow
+from app.travel_agent.prompt_cache import prompt_cache
 from app.travel_agent.prompts import (book_hotel_prompt, book_car_rental_prompt, book_excursion_prompt,
-                                  flight_booking_prompt, primary_assistant_prompt)
+                                  flight_booking_prompt, primary_assistant_prompt, summary_prompt)
 
 from app.travel_agent.routes import route_primary_assistant
 from app.travel_agent.tools.cars import search_car_rentals, book_car_rental, update_car_rental, cancel_car_rental
@@ -18,6 +21,7 @@ from app.travel_agent.tools.flights import (search_flights, update_ticket_to_new
                                         fetch_user_flight_information)
 
 from app.travel_agent.tools.hotels import search_hotels, book_hotel, update_hotel, cancel_hotel
+from app.travel_agent.tools.result_store import fetch_tool_result
 from app.travel_agent.tools.retriever import lookup_policy
 from app.travel_agent.utilities import State, Assistant, create_entry_node, create_tool_node_with_fallback, pop_dialog_state
 from app.travel_agent.routes import (route_to_workflow, route_update_flight, route_book_car_rental, route_book_hotel,
@@ -26,45 +30,65 @@ import streamlit as st
 
 
 # def get_builder(anthropic_api_key: SecretStr):
-llm = ChatAnthropic(model="claude-3-5-sonnet-20241022", temperature=1, anthropic_api_key=st.secrets["anthropic_api_key"])
+# ANTHROPIC_BASE_URL can point at a local stand-in of the API.
+llm = ChatAnthropic(
+    model="claude-3-5-sonnet-20241022",
+    temperature=1,
+    anthropic_api_key=st.secrets["anthropic_api_key"],
+    base_url=ANTHROPIC_BASE_URL,
+)
+
+
+def assistant_llm(tools: list):
+    """``llm`` with ``tools`` bound, for an assistant.
+
+    The assistant prompts mark their static part for prompt caching, and the callback records hits
+    from the usage of every response. The summarizer uses ``llm`` itself: its prompt is not cached,
+    so counting its calls would only add misses.
+    """
+    return llm.bind_tools(tools).with_config(callbacks=[prompt_cache])
+
+# Older turns are folded into a rolling summary so every assistant prompt stays within the budget.
+window = ConversationWindow(summary_prompt | llm, budget=CONTEXT_TOKEN_BUDGET)
 
-update_flight_safe_tools = [search_flights]
+update_flight_safe_tools = [search_flights, fetch_tool_result]
 update_flight_sensitive_tools = [update_ticket_to_new_flight, cancel_ticket]
 update_flight_tools = update_flight_safe_tools + update_flight_sensitive_tools
-update_flight_runnable = flight_booking_prompt | llm.bind_tools(
+update_flight_runnable = flight_booking_prompt | assistant_llm(
     update_flight_tools + [CompleteOrEscalate]
 )
 
-book_hotel_safe_tools = [search_hotels]
+book_hotel_safe_tools = [search_hotels, fetch_tool_result]
 book_hotel_sensitive_tools = [book_hotel, update_hotel, cancel_hotel]
 book_hotel_tools = book_hotel_safe_tools + book_hotel_sensitive_tools
-book_hotel_runnable = book_hotel_prompt | llm.bind_tools(
+book_hotel_runnable = book_hotel_prompt | assistant_llm(
     book_hotel_tools + [CompleteOrEscalate]
 )
 
-book_car_rental_safe_tools = [search_car_rentals]
+book_car_rental_safe_tools = [search_car_rentals, fetch_tool_result]
 book_car_rental_sensitive_tools = [
     book_car_rental,
     update_car_rental,
     cancel_car_rental,
 ]
 book_car_rental_tools = book_car_rental_safe_tools + book_car_rental_sensitive_tools
-book_car_rental_runnable = book_car_rental_prompt | llm.bind_tools(
+book_car_rental_runnable = book_car_rental_prompt | assistant_llm(
     book_car_rental_tools + [CompleteOrEscalate]
 )
 
-book_excursion_safe_tools = [search_trip_recommendations]
+book_excursion_safe_tools = [search_trip_recommendations, fetch_tool_result]
 book_excursion_sensitive_tools = [book_excursion, update_excursion, cancel_excursion]
 book_excursion_tools = book_excursion_safe_tools + book_excursion_sensitive_tools
-book_excursion_runnable = book_excursion_prompt | llm.bind_tools(
+book_excursion_runnable = book_excursion_prompt | assistant_llm(
     book_excursion_tools + [CompleteOrEscalate]
 )
 
 primary_assistant_tools = [
     search_flights,
     lookup_policy,
+    fetch_tool_result,
 ]
-assistant_runnable = primary_assistant_prompt | llm.bind_tools(
+assistant_runnable = primary_assistant_prompt | assistant_llm(
     primary_assistant_tools
     + [
         ToFlightBookingAssistant,
@@ -87,7 +111,7 @@ builder.add_node(
     "enter_update_flight",
     create_entry_node("Flight Updates & Booking Assistant", "update_flight"),
 )
-builder.add_node("update_flight", Assistant(update_flight_runnable))
+builder.add_node("update_flight", Assistant(update_flight_runnable, window))
 builder.add_edge("enter_update_flight", "update_flight")
 builder.add_node(
     "update_flight_sensitive_tools",
@@ -113,7 +137,7 @@ builder.add_node(
     "enter_book_car_rental",
     create_entry_node("Car Rental Assistant", "book_car_rental"),
 )
-builder.add_node("book_car_rental", Assistant(book_car_rental_runnable))
+builder.add_node("book_car_rental", Assistant(book_car_rental_runnable, window))
 builder.add_edge("enter_book_car_rental", "book_car_rental")
 builder.add_node(
     "book_car_rental_safe_tools",
@@ -140,7 +164,7 @@ builder.add_conditional_edges(
 builder.add_node(
     "enter_book_hotel", create_entry_node("Hotel Booking Assistant", "book_hotel")
 )
-builder.add_node("book_hotel", Assistant(book_hotel_runnable))
+builder.add_node("book_hotel", Assistant(book_hotel_runnable, window))
 builder.add_edge("enter_book_hotel", "book_hotel")
 builder.add_node(
     "book_hotel_safe_tools",
@@ -164,7 +188,7 @@ builder.add_node(
     "enter_book_excursion",
     create_entry_node("Trip Recommendation Assistant", "book_excursion"),
 )
-builder.add_node("book_excursion", Assistant(book_excursion_runnable))
+builder.add_node("book_excursion", Assistant(book_excursion_runnable, window))
 builder.add_edge("enter_book_excursion", "book_excursion")
 builder.add_node(
     "book_excursion_safe_tools",
@@ -183,7 +207,7 @@ builder.add_conditional_edges(
     ["book_excursion_safe_tools", "book_excursion_sensitive_tools", "leave_skill", END],
 )
 
-builder.add_node("primary_assistant", Assistant(assistant_runnable))
+builder.add_node("primary_assistant", Assistant(assistant_runnable, window))
 builder.add_node(
     "primary_assistant_tools", create_tool_node_with_fallback(primary_assistant_tools)
 )
@@ -0,0 +1,509 @@
+import asyncio
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.types import TASKS
+
+from .tools.connection import ConnectionManager
+
+schema = [
+    """CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT,
+        checkpoint BLOB,
+        metadata_type TEXT,
+        metadata BLOB,
+        depth INTEGER NOT NULL DEFAULT 0,
+        keyframe_id TEXT,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        value BLOB,
+        task_path TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS threads (
+        thread_id TEXT PRIMARY KEY,
+        last_used REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_threads_last_used ON threads (last_used)",
+]
+# Columns added after the first release of the table, for files created before them.
+added_columns = {
+    "depth": "INTEGER NOT NULL DEFAULT 0",
+    "keyframe_id": "TEXT",
+}
+compressed_suffix = "+zlib"
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """LangGraph checkpointer backed by a local SQLite file, shared by every worker process.
+
+    Only the latest ``keep_last`` checkpoints of each thread (and namespace) are kept, with the
+    chains they are rebuilt from; older ones and their writes are dropped as new ones are saved.
+    A background thread deletes threads that were not written to for ``ttl_seconds`` and hands
+    the freed pages back every ``compact_interval`` seconds.
+
+    List channels such as ``messages`` and ``dialog_state`` usually only grow, so a checkpoint
+    stores just the items appended since its parent; every ``keyframe_interval``-th checkpoint
+    of a chain (or one whose lists were rewritten) stores them in full. Payloads are compressed
+    with zlib, and reads rebuild the full state from the chain, caching recently used states.
+    """
+
+    def __init__(
+        self,
+        path: str = "checkpoints.sqlite",
+        keep_last: int = 10,
+        ttl_seconds: float = 24 * 3600,
+        compact_interval: float = 600,
+        keyframe_interval: int = 8,
+        cache_size: int = 64,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        super().__init__(serde=serde)
+        if keep_last < 2:
+            # The parent of the latest checkpoint holds its pending sends.
+            raise ValueError("keep_last must be at least 2")
+        self.path = path
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self.compact_interval = compact_interval
+        self.keyframe_interval = keyframe_interval
+        self.cache_size = cache_size
+        # (thread_id, checkpoint_ns, checkpoint_id) -> (depth, keyframe_id, list channels)
+        self._states: OrderedDict[tuple, tuple[int, str, dict[str, tuple]]] = OrderedDict()
+        self._states_lock = threading.Lock()
+        self._stats = {"puts": 0, "delta_puts": 0, "encoded_bytes": 0, "stored_bytes": 0}
+        self._db = ConnectionManager(lambda: self.path)
+        self._setup_lock = threading.Lock()
+        self._is_setup = False
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _setup(self):
+        if self._is_setup:
+            return
+        with self._setup_lock:
+            if not self._is_setup:
+                conn = self._db.connection()
+                for statement in schema:
+                    conn.execute(statement)
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(checkpoints)")}
+                for column, definition in added_columns.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE checkpoints ADD COLUMN {column} {definition}")
+                # Lets compaction hand freed pages back to the OS. The connection is already in
+                # WAL mode, so the setting only takes effect through a VACUUM, run once per file.
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+                self._is_setup = True
+
+    def _start_compactor(self):
+        if self._compactor is None and self.compact_interval:
+            with self._setup_lock:
+                if self._compactor is None:
+                    self._compactor = threading.Thread(
+                        target=self._compact_loop, name="checkpoint-compactor", daemon=True
+                    )
+                    self._compactor.start()
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception:
+                # A busy or locked DB just means the next round does the work.
+                pass
+
+    def compact(self) -> int:
+        """Delete threads idle for longer than the TTL and reclaim free pages.
+
+        Returns the number of threads deleted.
+        """
+        self._setup()
+        cutoff = time.time() - self.ttl_seconds
+        idle = [row["thread_id"] for row in self._db.fetch_all(
+            "SELECT thread_id FROM threads WHERE last_used < ?", (cutoff,)
+        )]
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+        conn = self._db.connection()
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return len(idle)
+
+    def close(self):
+        self._stop.set()
+        self._db.close()
+
+    def delete_thread(self, thread_id: str) -> None:
+        def delete(conn):
+            for table in ("checkpoints", "writes", "threads"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+        self._setup()
+        self._db.write(delete)
+        with self._states_lock:
+            for key in [key for key in self._states if key[0] == thread_id]:
+                del self._states[key]
+
+    def stats(self) -> dict:
+        """Stored sizes, and what this process wrote: ``encoded_bytes`` before compression and
+        ``stored_bytes`` after it, for ``puts`` checkpoints of which ``delta_puts`` were deltas."""
+        self._setup()
+        stored = self._db.fetch_one(
+            "SELECT COUNT(*) AS checkpoints, COALESCE(SUM(depth > 0), 0) AS deltas, "
+            "COALESCE(SUM(LENGTH(checkpoint)), 0) AS checkpoint_bytes FROM checkpoints"
+        )
+        writes = self._db.fetch_one("SELECT COUNT(*) AS writes, COALESCE(SUM(LENGTH(value)), 0) AS write_bytes FROM writes")
+        with self._states_lock:
+            written = dict(self._stats)
+        return {
+            **stored,
+            "bytes_per_checkpoint": stored["checkpoint_bytes"] / max(stored["checkpoints"], 1),
+            **writes,
+            **written,
+            "compression_ratio": written["encoded_bytes"] / max(written["stored_bytes"], 1),
+        }
+
+    def _dumps(self, value: Any) -> tuple[str, bytes]:
+        value_type, blob = self.serde.dumps_typed(value)
+        return value_type + compressed_suffix, zlib.compress(blob)
+
+    def _loads(self, value_type: str, blob: bytes) -> Any:
+        if value_type.endswith(compressed_suffix):
+            value_type, blob = value_type[:-len(compressed_suffix)], zlib.decompress(blob)
+        return self.serde.loads_typed((value_type, blob))
+
+    def _remember(self, key: tuple, depth: int, keyframe_id: str, channel_values: dict):
+        lists = {channel: tuple(value) for channel, value in channel_values.items() if isinstance(value, list)}
+        with self._states_lock:
+            self._states[key] = (depth, keyframe_id, lists)
+            self._states.move_to_end(key)
+            while len(self._states) > self.cache_size:
+                self._states.popitem(last=False)
+
+    def _state(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> Optional[tuple[int, str, dict[str, tuple]]]:
+        """Depth, keyframe id and list channels of a stored checkpoint, or None if there is none."""
+        key = (thread_id, checkpoint_ns, checkpoint_id)
+        with self._states_lock:
+            if key in self._states:
+                self._states.move_to_end(key)
+                return self._states[key]
+        row = self._db.fetch_one(
+            "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        if row is None:
+            return None
+        self._decode(row)
+        with self._states_lock:
+            return self._states.get(key)
+
+    def _decode(self, row: dict) -> Checkpoint:
+        """The checkpoint stored in ``row``, with its list deltas applied to the parent's lists."""
+        checkpoint = self._loads(row["type"], row["checkpoint"])
+        deltas = checkpoint.pop("channel_deltas", None)
+        if deltas:
+            parent = self._state(row["thread_id"], row["checkpoint_ns"], row["parent_checkpoint_id"])
+            if parent is None:
+                raise ValueError(f"The checkpoint {row['parent_checkpoint_id']} that {row['checkpoint_id']} extends is gone")
+            for channel, (prefix, tail) in deltas.items():
+                checkpoint["channel_values"][channel] = list(parent[2][channel][:prefix]) + tail
+        self._remember(
+            (row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"]),
+            row["depth"], row["keyframe_id"] or row["checkpoint_id"], checkpoint["channel_values"],
+        )
+        return checkpoint
+
+    def _encode(self, config: RunnableConfig, checkpoint: Checkpoint) -> tuple[dict, int, str]:
+        """``checkpoint`` with its grown lists replaced by deltas against the parent when that
+        keeps the chain short enough, plus the depth and keyframe id to store it with."""
+        c = checkpoint.copy()
+        c.pop("pending_sends")  # type: ignore[misc]
+        configurable = config["configurable"]
+        parent = None
+        if parent_id := configurable.get("checkpoint_id"):
+            parent = self._state(configurable["thread_id"], configurable["checkpoint_ns"], parent_id)
+        if parent is None or parent[0] + 1 >= self.keyframe_interval:
+            return c, 0, checkpoint["id"]
+        values, deltas = dict(c["channel_values"]), {}
+        for channel, value in c["channel_values"].items():
+            base = parent[2].get(channel)
+            if (
+                isinstance(value, list)
+                and base is not None
+                and len(base) <= len(value)
+                and all(a is b or a == b for a, b in zip(base, value))
+            ):
+                deltas[channel] = [len(base), value[len(base):]]
+                del values[channel]
+        if not deltas:
+            return c, 0, checkpoint["id"]
+        return {**c, "channel_values": values, "channel_deltas": deltas}, parent[0] + 1, parent[1]
+
+    def _load_tuple(self, row: dict) -> CheckpointTuple:
+        thread_id, checkpoint_ns = row["thread_id"], row["checkpoint_ns"]
+        checkpoint_id, parent_id = row["checkpoint_id"], row["parent_checkpoint_id"]
+        writes = self._db.fetch_all(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        sends = []
+        if parent_id:
+            sends = self._db.fetch_all(
+                "SELECT type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ? "
+                "ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, parent_id, TASKS),
+            )
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **self._decode(row),
+                "pending_sends": [self._loads(s["type"], s["value"]) for s in sends],
+            },
+            metadata=self._loads(row["metadata_type"], row["metadata"]),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (w["task_id"], w["channel"], self._loads(w["type"], w["value"])) for w in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._setup()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            row = self._db.fetch_one(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            row = self._db.fetch_one(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        return self._load_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self._setup()
+        conditions, params = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._db.fetch_all(
+            f"SELECT * FROM checkpoints {where} ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC",
+            params,
+        )
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self._loads(row["metadata_type"], row["metadata"])
+                if not all(value == metadata.get(key) for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._load_tuple(row)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        self._setup()
+        self._start_compactor()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        encoded, depth, keyframe_id = self._encode(config, checkpoint)
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(encoded)
+        encoded_bytes = len(checkpoint_blob)
+        checkpoint_type, checkpoint_blob = checkpoint_type + compressed_suffix, zlib.compress(checkpoint_blob)
+        metadata_type, metadata_blob = self._dumps(get_checkpoint_metadata(config, metadata))
+
+        def save(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata, depth, keyframe_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                    checkpoint_type, checkpoint_blob, metadata_type, metadata_blob, depth, keyframe_id,
+                ),
+            )
+            self._touch(conn, thread_id)
+            # Drop the checkpoints older than the newest ``keep_last`` of this namespace, a whole
+            # chain (keyframe and deltas) at a time: a chain any kept checkpoint is rebuilt from
+            # stays, including the older one a forked branch still extends.
+            conn.execute(
+                "WITH kept AS (SELECT checkpoint_id, COALESCE(keyframe_id, checkpoint_id) AS chain "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT ?) "
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id < (SELECT MIN(checkpoint_id) FROM kept) "
+                "AND COALESCE(keyframe_id, checkpoint_id) NOT IN (SELECT chain FROM kept)",
+                (thread_id, checkpoint_ns, self.keep_last, thread_id, checkpoint_ns),
+            )
+            conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN "
+                "(SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+            )
+
+        self._db.write(save)
+        self._remember((thread_id, checkpoint_ns, checkpoint["id"]), depth, keyframe_id, checkpoint["channel_values"])
+        with self._states_lock:
+            self._stats["puts"] += 1
+            self._stats["delta_puts"] += depth > 0
+            self._stats["encoded_bytes"] += encoded_bytes
+            self._stats["stored_bytes"] += len(checkpoint_blob)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._setup()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        replace, keep_first = [], []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self._dumps(value)
+            # Special channels (errors, interrupts) overwrite; regular writes keep the first value.
+            (replace if channel in WRITES_IDX_MAP else keep_first).append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                channel, value_type, value_blob, task_path,
+            ))
+
+        def save(conn):
+            conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", replace)
+            conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", keep_first)
+            self._touch(conn, thread_id)
+
+        self._db.write(save)
+
+    @staticmethod
+    def _touch(conn, thread_id: str):
+        conn.execute(
+            "INSERT INTO threads (thread_id, last_used) VALUES (?, ?) "
+            "ON CONFLICT (thread_id) DO UPDATE SET last_used = excluded.last_used",
+            (thread_id, time.time()),
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
@@ -7,6 +7,33 @@ HF_LLM_API_KEY = os.getenv("HF_LLM_API_KEY")
 HF_LLAMA_URL = os.getenv("HF_LLAMA_URL")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
+# Serve search_flights from the in-memory flight index instead of querying SQLite
+FLIGHT_INDEX = os.getenv("FLIGHT_INDEX", "false").lower() in ("1", "true", "yes")
 
+# Optional SQLite file shared by all processes for cached policy query embeddings and results
+POLICY_CACHE_PATH = os.getenv("POLICY_CACHE_PATH")
 
+# Policy retrieval: "dense" (embeddings), "hybrid" (BM25 first, embeddings when it is unsure) or "lexical" (offline)
+POLICY_RETRIEVAL = os.getenv("POLICY_RETRIEVAL", "dense").lower()
 
+# Vector index under the policy retriever: "exact" (brute force) or "ivf" (approximate, for large corpora)
+POLICY_INDEX = os.getenv("POLICY_INDEX", "exact").lower()
+
+# Resident storage of the policy vectors: "float32", "float16" or "int8" (re-ranked in float32)
+POLICY_QUANTIZE = os.getenv("POLICY_QUANTIZE", "float32").lower()
+
+# Conversation checkpoints: SQLite file, checkpoints kept per thread and idle-thread lifetime
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoints.sqlite")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))
+CHECKPOINT_TTL_HOURS = float(os.getenv("CHECKPOINT_TTL_HOURS", "24"))
+
+# Tokens of conversation history, summary and user info sent to the assistants per step
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+
+# Tool results longer than this many characters are kept out of the conversation, behind a handle
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", CHECKPOINT_PATH)
+RESULT_INLINE_CHARS = int(os.getenv("RESULT_INLINE_CHARS", "2000"))
+RESULT_TTL_HOURS = float(os.getenv("RESULT_TTL_HOURS", str(CHECKPOINT_TTL_HOURS)))
+
+# Anthropic API endpoint; point it at a local stand-in to run the assistants offline
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
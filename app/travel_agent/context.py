@@ -0,0 +1,78 @@
+import json
+from typing import Optional
+
+from langchain_core.messages import AnyMessage, HumanMessage, get_buffer_string
+from langchain_core.runnables import Runnable
+
+from .tools.chunking import count_tokens
+
+# Role markers and separators the API adds around every message.
+message_overhead = 4
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """Estimated tokens of ``message``, tool call arguments included."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tokens = count_tokens(content) + message_overhead
+    if getattr(message, "tool_calls", None):
+        tokens += count_tokens(json.dumps(message.tool_calls))
+    return tokens
+
+
+class ConversationWindow:
+    """Fits the conversation history of a state into a token budget before it reaches the LLM.
+
+    ``user_info`` and the most recent turns are passed on unchanged; older turns are folded into
+    a rolling summary by ``summarizer`` (a runnable taking ``summary`` and ``transcript``). The
+    summary and the id of the last message it covers live in the state, so each message is
+    summarized once. When the budget is exceeded the history is cut back to ``keep_fraction`` of
+    it, so the summarizer runs every few turns rather than on every step. The static part of the
+    system prompt comes on top of ``budget``; a single turn larger than the budget is kept whole.
+    """
+
+    def __init__(self, summarizer: Runnable, budget: int = 8000, keep_fraction: float = 0.5):
+        self.summarizer = summarizer
+        self.budget = budget
+        self.keep_fraction = keep_fraction
+
+    def fit(self, state: dict) -> tuple[list[AnyMessage], dict]:
+        """The messages to prompt with, and the state update recording a refreshed summary."""
+        messages = state["messages"]
+        summary = state.get("summary") or ""
+        start = _index_after(messages, state.get("summarized_until"))
+        counts = [message_tokens(message) for message in messages[start:]]
+        fixed = count_tokens(state.get("user_info") or "") + count_tokens(summary)
+        if fixed + sum(counts) <= self.budget:
+            return _with_summary(summary, messages[start:]), {}
+
+        # Cuts fall before a user message, so tool calls always stay with their results.
+        target = self.keep_fraction * self.budget - fixed
+        cut, suffix = None, sum(counts)
+        for i in range(start + 1, len(messages)):
+            suffix -= counts[i - 1 - start]
+            if isinstance(messages[i], HumanMessage):
+                cut = i
+                if suffix <= target:
+                    break
+        if cut is None:
+            return _with_summary(summary, messages[start:]), {}
+
+        result = self.summarizer.invoke({"summary": summary or "(none)", "transcript": get_buffer_string(messages[start:cut])})
+        summary = result if isinstance(result, str) else result.content
+        update = {"summary": summary, "summarized_until": messages[cut - 1].id}
+        return _with_summary(summary, messages[cut:]), update
+
+
+def _index_after(messages: list[AnyMessage], message_id: Optional[str]) -> int:
+    if message_id:
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == message_id:
+                return i + 1
+    return 0
+
+
+def _with_summary(summary: str, messages: list[AnyMessage]) -> list[AnyMessage]:
+    if not summary:
+        return list(messages)
+    note = HumanMessage(content=f"Summary of the earlier conversation:\n<Summary>\n{summary}\n</Summary>")
+    return [note, *messages]
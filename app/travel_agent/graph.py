@@ -1,11 +1,15 @@
-from langgraph.checkpoint.memory import MemorySaver
 from .builder import builder
+from .checkpoint import SQLiteCheckpointSaver
+from .config import CHECKPOINT_KEEP_LAST, CHECKPOINT_PATH, CHECKPOINT_TTL_HOURS
 
 
 # def get_langgraph(anthropic_api_key):
 #     builder = get_builder(anthropic_api_key=anthropic_api_key)
 
-memory = MemorySaver()
+# On disk, so any worker process can resume a session and memory stays flat over long uptimes.
+memory = SQLiteCheckpointSaver(
+    CHECKPOINT_PATH, keep_last=CHECKPOINT_KEEP_LAST, ttl_seconds=CHECKPOINT_TTL_HOURS * 3600
+)
 part_4_graph = builder.compile(
     checkpointer=memory,
     # Let the user approve or deny the use of sensitive tools
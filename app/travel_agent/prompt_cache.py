@@ -0,0 +1,73 @@
+import threading
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+class PromptCacheStats(BaseCallbackHandler):
+    """Counts Anthropic prompt cache hits from the usage reported with every LLM response.
+
+    A call is a hit when part of its prompt was read from the cache, a write when it stored a
+    new prefix (the first call after the static prompt or tools change, or after the cache
+    expired), and a miss when it did neither.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "hits": 0,
+            "writes": 0,
+            "misses": 0,
+            "input_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_creation_tokens": 0,
+        }
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None:
+                    self.record(message)
+
+    def record(self, message) -> None:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            details = usage.get("input_token_details") or {}
+            input_tokens = usage.get("input_tokens", 0)
+            cache_read = details.get("cache_read") or 0
+            cache_creation = details.get("cache_creation") or 0
+        else:
+            # Older responses only carry the raw Anthropic usage, whose input_tokens exclude the cache.
+            usage = message.response_metadata.get("usage")
+            if not usage:
+                return
+            cache_read = usage.get("cache_read_input_tokens") or 0
+            cache_creation = usage.get("cache_creation_input_tokens") or 0
+            input_tokens = usage.get("input_tokens", 0) + cache_read + cache_creation
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["hits"] += cache_read > 0
+            self._stats["writes"] += cache_creation > 0 and not cache_read
+            self._stats["misses"] += not (cache_read or cache_creation)
+            self._stats["input_tokens"] += input_tokens
+            self._stats["cache_read_tokens"] += cache_read
+            self._stats["cache_creation_tokens"] += cache_creation
+
+    def stats(self) -> dict:
+        """Counters, the hit rate, and the input tokens served from the cache instead of being
+        processed again (``saved_tokens``)."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["calls"] if stats["calls"] else 0.0
+        stats["saved_tokens"] = stats["cache_read_tokens"]
+        return stats
+
+
+prompt_cache = PromptCacheStats()
+
+
+def prompt_cache_stats() -> dict:
+    return prompt_cache.stats()
@@ -7,15 +7,16 @@ from app.travel_agent.tools.flights import search_flights
 from app.travel_agent.tools.cars import search_car_rentals
 from app.travel_agent.tools.hotels import search_hotels
 from app.travel_agent.tools.excursions import search_trip_recommendations
+from app.travel_agent.tools.result_store import fetch_tool_result
 
 from typing import Literal
 
 
 
-update_flight_safe_tools = [search_flights]
-book_car_rental_safe_tools = [search_car_rentals]
-book_excursion_safe_tools = [search_trip_recommendations]
-book_hotel_safe_tools = [search_hotels]
+update_flight_safe_tools = [search_flights, fetch_tool_result]
+book_car_rental_safe_tools = [search_car_rentals, fetch_tool_result]
+book_excursion_safe_tools = [search_trip_recommendations, fetch_tool_result]
+book_hotel_safe_tools = [search_hotels, fetch_tool_result]
 
 def route_primary_assistant(
     state: State,
@@ -1,8 +1,14 @@
 from datetime import date, datetime
 from typing import Optional, Union
 from langchain_core.tools import tool
-from .database import db
-import sqlite3
+from .connection import update_row
+from .search import (availability_conditions, default_page_size, match_expression, paginate,
+                     text_search_query)
+
+# Columns returned by the search tool, in a fixed order. All of them are short, so none is cut;
+# columns added to the table later stay out of the results until they are listed here.
+car_rental_columns = ["id", "name", "location", "price_tier", "start_date", "end_date", "booked"]
+
 
 @tool
 def search_car_rentals(
@@ -11,7 +17,9 @@ def search_car_rentals(
     price_tier: Optional[str] = None,
     start_date: Optional[Union[datetime, date]] = None,
     end_date: Optional[Union[datetime, date]] = None,
-) -> list[dict]:
+    page_size: int = default_page_size,
+    cursor: Optional[str] = None,
+) -> dict:
     """
     Search for car rentals based on location, name, price tier, start date, and end date.
 
@@ -21,32 +29,23 @@ def search_car_rentals(
         price_tier (Optional[str]): The price tier of the car rental. Defaults to None.
         start_date (Optional[Union[datetime, date]]): The start date of the car rental. Defaults to None.
         end_date (Optional[Union[datetime, date]]): The end date of the car rental. Defaults to None.
+        page_size (int): The number of results per page. Defaults to 10, at most 50.
+        cursor (Optional[str]): The next_cursor of a previous page to continue from. Defaults to None.
 
     Returns:
-        list[dict]: A list of car rental dictionaries matching the search criteria.
+        dict: A page of car rentals matching the search criteria, best matches first, as "rows" under a
+        shared "columns" header, with the "total" number of matches and the "next_cursor" for the next page.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM car_rentals WHERE 1=1"
-    params = []
-
-    if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
-    if name:
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
-    # For our tutorial, we will let you match on any dates and price tier.
-    # (since our toy dataset doesn't have much data)
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-
-    conn.close()
-
-    return [
-        dict(zip([column[0] for column in cursor.description], row)) for row in results
-    ]
+    match = match_expression(all_of={"location": location, "name": name})
+    # Keep only options available for (part of) the requested dates in the requested tier.
+    conditions, params = availability_conditions("start_date", "end_date", start_date, end_date)
+    if price_tier:
+        conditions.append("t.price_tier = ? COLLATE NOCASE")
+        params.append(price_tier)
+    query, params = text_search_query(
+        "car_rentals", match, conditions, params, columns=car_rental_columns
+    )
+    return paginate(query, params, page_size, cursor)
 
 
 @tool
@@ -60,17 +59,11 @@ def book_car_rental(rental_id: int) -> str:
     Returns:
         str: A message indicating whether the car rental was successfully booked or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE car_rentals SET booked = 1 WHERE id = ?", (rental_id,))
-    conn.commit()
+    rowcount = update_row("car_rentals", rental_id, {"booked": 1})
 
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Car rental {rental_id} successfully booked."
     else:
-        conn.close()
         return f"No car rental found with ID {rental_id}."
 
 
@@ -91,26 +84,11 @@ def update_car_rental(
     Returns:
         str: A message indicating whether the car rental was successfully updated or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    if start_date:
-        cursor.execute(
-            "UPDATE car_rentals SET start_date = ? WHERE id = ?",
-            (start_date, rental_id),
-        )
-    if end_date:
-        cursor.execute(
-            "UPDATE car_rentals SET end_date = ? WHERE id = ?", (end_date, rental_id)
-        )
-
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
+    rowcount = update_row("car_rentals", rental_id, {"start_date": start_date, "end_date": end_date})
+
+    if rowcount > 0:
         return f"Car rental {rental_id} successfully updated."
     else:
-        conn.close()
         return f"No car rental found with ID {rental_id}."
 
 
@@ -125,15 +103,9 @@ def cancel_car_rental(rental_id: int) -> str:
     Returns:
         str: A message indicating whether the car rental was successfully cancelled or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE car_rentals SET booked = 0 WHERE id = ?", (rental_id,))
-    conn.commit()
+    rowcount = update_row("car_rentals", rental_id, {"booked": 0})
 
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Car rental {rental_id} successfully cancelled."
     else:
-        conn.close()
         return f"No car rental found with ID {rental_id}."
\ No newline at end of file
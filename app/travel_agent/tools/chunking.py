@@ -0,0 +1,89 @@
+import re
+from typing import Iterable, Iterator
+
+_heading = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+# Roughly one BPE token: a run of up to four word characters, or one punctuation mark. It is
+# deterministic, so chunk boundaries (and the content hashes the FAQ index reuses) never depend
+# on which tokenizer happens to be installed.
+_token = re.compile(r"\w{1,4}|[^\w\s]")
+
+default_max_tokens = 200
+default_overlap = 40
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in _token.finditer(text))
+
+
+def iter_sections(lines: Iterable[str]) -> Iterator[tuple[list[str], str]]:
+    """Yield ``(breadcrumbs, body)`` per markdown section, reading ``lines`` one at a time.
+
+    ``breadcrumbs`` are the titles of the enclosing headings, outermost first. Sections without
+    any text of their own are skipped.
+    """
+    trail: list[tuple[int, str]] = []
+    body: list[str] = []
+    for line in lines:
+        match = _heading.match(line.rstrip("\r\n"))
+        if match is None:
+            body.append(line if line.endswith("\n") else line + "\n")
+            continue
+        if "".join(body).strip():
+            yield [title for _, title in trail], "".join(body).strip()
+        body = []
+        level = len(match.group(1))
+        while trail and trail[-1][0] >= level:
+            trail.pop()
+        trail.append((level, match.group(2)))
+    if "".join(body).strip():
+        yield [title for _, title in trail], "".join(body).strip()
+
+
+def chunk_text(text: str, max_tokens: int = default_max_tokens, overlap: int = default_overlap) -> Iterator[str]:
+    """Split ``text`` into pieces of at most ``max_tokens`` tokens, each repeating the last
+    ``overlap`` tokens of the previous one."""
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    spans = [match.span() for match in _token.finditer(text)]
+    # Cuts only fall where a word starts, unless a single word is longer than a whole chunk.
+    word_start = [a == 0 or not (text[a - 1].isalnum() or text[a - 1] == "_") for a, _ in spans]
+    start = 0
+    while start < len(spans):
+        end = min(start + max_tokens, len(spans))
+        if end < len(spans):
+            cut = end
+            while cut > start + 1 and not word_start[cut]:
+                cut -= 1
+            end = cut if word_start[cut] else end
+        yield text[spans[start][0]:spans[end - 1][1]]
+        if end == len(spans):
+            break
+        following = max(end - overlap, start + 1)
+        while following > start + 1 and not word_start[following]:
+            following -= 1
+        start = following
+
+
+def iter_chunks(
+    lines: Iterable[str], max_tokens: int = default_max_tokens, overlap: int = default_overlap
+) -> Iterator[dict]:
+    """Stream token-bounded chunks of a markdown document as retriever docs.
+
+    Each chunk starts with its heading breadcrumb line, which counts towards ``max_tokens``,
+    and carries ``breadcrumbs`` and a stable ``id`` (breadcrumb path plus chunk number).
+    """
+    seen: dict[str, int] = {}
+    for breadcrumbs, body in iter_sections(lines):
+        header = " > ".join(breadcrumbs)
+        budget = max(max_tokens - count_tokens(header), overlap + 1)
+        path = "/".join(breadcrumbs)
+        # Repeated heading paths get a suffix so ids stay unique.
+        seen[path] = seen.get(path, 0) + 1
+        if seen[path] > 1:
+            path = f"{path}~{seen[path]}"
+        for n, piece in enumerate(chunk_text(body, budget, overlap)):
+            yield {
+                "id": f"{path}#{n}",
+                "page_content": f"{header}\n{piece}" if header else piece,
+                "breadcrumbs": breadcrumbs,
+            }
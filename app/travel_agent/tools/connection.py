@@ -0,0 +1,165 @@
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+from .database import get_db
+
+T = TypeVar("T")
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    return getattr(error, "sqlite_errorcode", None) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+class ConnectionManager:
+    """Hands out one reusable SQLite connection per thread.
+
+    Connections run in autocommit mode with WAL journaling and a busy timeout, so readers never
+    block the writer; writes go through ``transaction()``. Python's per-connection statement
+    cache keeps the prepared statements of the tools alive between calls.
+    """
+
+    def __init__(
+        self,
+        path: Callable[[], str],
+        busy_timeout: float = 5.0,
+        cached_statements: int = 256,
+        busy_retries: int = 4,
+        busy_backoff: float = 0.05,
+    ):
+        self._path = path
+        self._busy_timeout = busy_timeout
+        self._cached_statements = cached_statements
+        self._busy_retries = busy_retries
+        self._busy_backoff = busy_backoff
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "transactions": 0,
+            "rollbacks": 0,
+            "busy_errors": 0,
+            "busy_retries": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _record(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._record(connections_reused=1)
+            return conn
+        conn = sqlite3.connect(
+            self._path(),
+            timeout=self._busy_timeout,
+            isolation_level=None,
+            cached_statements=self._cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}")
+        self._local.conn = conn
+        self._record(connections_opened=1)
+        return conn
+
+    def fetch_all(self, query: str, params=()) -> list[dict]:
+        cursor = self.connection().execute(query, params)
+        column_names = [column[0] for column in cursor.description]
+        return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+
+    def fetch_one(self, query: str, params=()) -> dict | None:
+        cursor = self.connection().execute(query, params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the block as one ``BEGIN IMMEDIATE`` transaction on this thread's connection.
+
+        The time spent waiting for the write lock is recorded in the wait metrics.
+        """
+        conn = self.connection()
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self._record(busy_errors=1, wait_seconds=time.perf_counter() - start)
+            raise
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats["transactions"] += 1
+            self._stats["wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            self._record(rollbacks=1)
+            raise
+
+    def write(self, operation: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``operation(conn)`` in one ``BEGIN IMMEDIATE`` transaction and return its result.
+
+        If the DB stays locked past the busy timeout the whole operation is retried, up to
+        ``busy_retries`` times with jittered exponential backoff, so ``operation`` must only
+        touch the DB through ``conn``.
+        """
+        for attempt in range(self._busy_retries + 1):
+            try:
+                with self.transaction() as conn:
+                    return operation(conn)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == self._busy_retries:
+                    raise
+                self._record(busy_retries=1)
+                time.sleep(self._busy_backoff * 2**attempt * random.uniform(0.5, 1.0))
+
+    def update_row(self, table: str, row_id: Any, values: dict, key: str = "id") -> int:
+        """Set the non-None ``values`` on the row of ``table`` with ``key = row_id`` in one statement.
+
+        Returns the number of updated rows, 0 when there was nothing to set.
+        """
+        values = {column: value for column, value in values.items() if value is not None}
+        if not values:
+            return 0
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        query = f"UPDATE {table} SET {assignments} WHERE {key} = ?"
+        params = [*values.values(), row_id]
+        return self.write(lambda conn: conn.execute(query, params).rowcount)
+
+    def close(self):
+        """Close the calling thread's connection, if it has one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        if stats["transactions"]:
+            stats["avg_wait_seconds"] = stats["wait_seconds"] / stats["transactions"]
+        return stats
+
+
+manager = ConnectionManager(get_db)
+
+connection = manager.connection
+fetch_all = manager.fetch_all
+fetch_one = manager.fetch_one
+transaction = manager.transaction
+write = manager.write
+update_row = manager.update_row
+connection_stats = manager.stats
@@ -1,67 +1,250 @@
+import argparse
+import json
 import os
-import shutil
 import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
 
-import pandas as pd
-import requests
+from .migrations import latest_version, migrate
 
 db_url = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/travel2.sqlite"
 local_file = "travel2.sqlite"
 # The backup lets us restart for each tutorial section
 backup_file = "travel2.backup.sqlite"
-overwrite = False
-if overwrite or not os.path.exists(local_file):
-    response = requests.get(db_url)
-    response.raise_for_status()  # Ensure the request was successful
-    with open(local_file, "wb") as f:
-        f.write(response.content)
-    # Backup - we will use this to "reset" our DB in each section
-    shutil.copy(local_file, backup_file)
+# Written once the DB is downloaded and rebased, so later processes can skip the work.
+stamp_file = "travel2.sqlite.stamp"
+stamp_version = 3
+# Stamps older than this were written by a rebase that lost the sub-day part of date-only shifts,
+# so their DB is restored from the backup once instead of being shifted further.
+drifting_stamp_version = 2
+# A stamp older than this is refreshed so flights keep lining up with the current time.
+stamp_max_age = 6 * 3600
 
-
-# Convert the flights to present time for our tutorial
-def update_dates(file):
-    shutil.copy(backup_file, file)
-    conn = sqlite3.connect(file)
-    cursor = conn.cursor()
-
-    tables = pd.read_sql(
-        "SELECT name FROM sqlite_master WHERE type='table';", conn
-    ).name.tolist()
-    tdf = {}
-    for t in tables:
-        tdf[t] = pd.read_sql(f"SELECT * from {t}", conn)
-
-    example_time = pd.to_datetime(
-        tdf["flights"]["actual_departure"].replace("\\N", pd.NaT)
-    ).max()
-    current_time = pd.to_datetime("now").tz_localize(example_time.tz)
-    time_diff = current_time - example_time
-
-    tdf["bookings"]["book_date"] = (
-        pd.to_datetime(tdf["bookings"]["book_date"].replace("\\N", pd.NaT), utc=True)
-        + time_diff
-    )
-
-    datetime_columns = [
+# Only these columns hold absolute timestamps; every other table is left untouched.
+# Hotel and car rental availability windows move with the flights so date filters keep matching.
+datetime_columns = {
+    "flights": [
         "scheduled_departure",
         "scheduled_arrival",
         "actual_departure",
         "actual_arrival",
-    ]
-    for column in datetime_columns:
-        tdf["flights"][column] = (
-            pd.to_datetime(tdf["flights"][column].replace("\\N", pd.NaT)) + time_diff
-        )
-
-    for table_name, df in tdf.items():
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
-    del df
-    del tdf
-    conn.commit()
-    conn.close()
+    ],
+    "bookings": ["book_date"],
+    "hotels": ["checkin_date", "checkout_date"],
+    "car_rentals": ["start_date", "end_date"],
+}
+# Offsets smaller than this are not worth rewriting a table for.
+min_shift_seconds = 60
+
+
+def _shift_expression(column: str) -> str:
+    """SQL expression moving a '%Y-%m-%d[ %H:%M:%S[.%f]%z]' text timestamp by ``:shift`` seconds.
+
+    Dates stay dates and move by ``:day_shift`` whole days instead. For timestamps the wall-clock
+    part is shifted and the original fraction and UTC offset are kept, so the values stay
+    parseable by ``datetime.strptime(..., "%Y-%m-%d %H:%M:%S.%f%z")``.
+    """
+    return (
+        f"CASE WHEN length({column}) <= 10 THEN date({column}, :day_shift || ' days') ELSE "
+        f"strftime('%Y-%m-%d %H:%M:%S', substr({column}, 1, 19), :shift || ' seconds') || "
+        f"CASE WHEN substr({column}, 20, 1) = '.' THEN substr({column}, 20) "
+        f"ELSE '.000000' || substr({column}, 20) END END"
+    )
+
+
+def _read_rebase(conn: sqlite3.Connection) -> dict[str, tuple[float, int]] | None:
+    """Return ``{table: (anchor_epoch, applied_shift_seconds)}`` recorded by previous rebases.
+
+    None when the flights were never rebased (or by a version that tracked it differently).
+    """
+    try:
+        rows = conn.execute(
+            "SELECT table_name, anchor_epoch, shift_seconds FROM date_rebase"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    recorded = {table: (anchor, shift) for table, anchor, shift in rows}
+    return recorded if "flights" in recorded else None
+
+
+def rebase_dates(conn: sqlite3.Connection, now: datetime | None = None) -> dict[str, int]:
+    """Shift the timestamps in ``datetime_columns`` in place so the latest departure is ``now``.
+
+    The first rebase anchors on the latest ``actual_departure`` of the pristine data and records
+    it per table together with the applied shift in ``date_rebase``. Later calls only apply the
+    offset that accumulated since then, and a table added to ``datetime_columns`` later gets the
+    full shift. Returns the number of seconds each table was moved by.
+    """
+    now = now or datetime.now(timezone.utc)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        recorded = _read_rebase(conn)
+        if recorded is None:
+            conn.execute("DROP TABLE IF EXISTS date_rebase")
+            conn.execute(
+                "CREATE TABLE date_rebase ("
+                "table_name TEXT PRIMARY KEY, anchor_epoch REAL NOT NULL, "
+                "shift_seconds INTEGER NOT NULL, rebased_at TEXT NOT NULL)"
+            )
+            (anchor_epoch,) = conn.execute(
+                "SELECT (max(julianday(actual_departure)) - 2440587.5) * 86400.0 FROM flights"
+            ).fetchone()
+            recorded = {}
+        else:
+            anchor_epoch = recorded["flights"][0]
+
+        shifts = {}
+        for table, columns in datetime_columns.items():
+            if table not in recorded:
+                for column in columns:
+                    conn.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} = '\\N'")
+            applied = recorded.get(table, (anchor_epoch, 0))[1]
+            shift = round(now.timestamp() - anchor_epoch) - applied
+            if table in recorded and abs(shift) < min_shift_seconds:
+                continue
+            # Dates can only move by whole days: they always sit the whole days of the total shift
+            # away from the pristine data, so small shifts add up instead of being dropped.
+            day_shift = (applied + shift) // 86400 - applied // 86400
+            assignments = ", ".join(f"{c} = {_shift_expression(c)}" for c in columns)
+            conn.execute(f"UPDATE {table} SET {assignments}", {"shift": shift, "day_shift": day_shift})
+            conn.execute(
+                "INSERT OR REPLACE INTO date_rebase (table_name, anchor_epoch, shift_seconds, rebased_at) "
+                "VALUES (?, ?, ?, ?)",
+                (table, anchor_epoch, applied + shift, now.isoformat()),
+            )
+            shifts[table] = shift
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return shifts
+
+
+def _restore_backup(file):
+    # The SQLite backup API instead of a file copy: the DB runs in WAL mode, and copying over it
+    # would leave a stale -wal file behind (and break any connection that is still open).
+    src = sqlite3.connect(backup_file)
+    dst = sqlite3.connect(file)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+# Convert the flights to present time for our tutorial
+def update_dates(file, reset: bool = False):
+    """Bring the dates in ``file`` up to the present.
+
+    A database that was rebased before is shifted in place by the remaining offset. A fresh
+    database (or ``reset=True``) is first restored from the backup so the original schema,
+    indexes and types are kept.
+    """
+    restore = reset or not os.path.exists(file)
+    if not restore:
+        # Written by an older version or never rebased: start from the pristine copy.
+        conn = sqlite3.connect(file)
+        restore = _read_rebase(conn) is None
+        conn.close()
+    if restore:
+        _restore_backup(file)
+
+    conn = sqlite3.connect(file, isolation_level=None)
+    try:
+        rebase_dates(conn)
+    finally:
+        conn.close()
 
     return file
 
 
-db = update_dates(local_file)
\ No newline at end of file
+def migrate_database(file) -> int:
+    conn = sqlite3.connect(file, isolation_level=None)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def download_database(overwrite: bool = False):
+    if overwrite or not os.path.exists(local_file):
+        import requests
+
+        response = requests.get(db_url)
+        response.raise_for_status()  # Ensure the request was successful
+        # Backup - we will use this to "reset" our DB in each section
+        with open(backup_file, "wb") as f:
+            f.write(response.content)
+        _restore_backup(local_file)
+
+
+def _read_stamp() -> dict | None:
+    try:
+        with open(stamp_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_prepared() -> bool:
+    """Whether a previous bootstrap left a DB that is still fresh enough to use as-is."""
+    stamp = _read_stamp()
+    return (
+        stamp is not None
+        and stamp.get("version") == stamp_version
+        and stamp.get("schema_version") == latest_version
+        and os.path.exists(local_file)
+        and time.time() - stamp.get("prepared_at", 0) < stamp_max_age
+    )
+
+
+_lock = threading.Lock()
+_db_path: str | None = None
+
+
+def prepare_database(overwrite: bool = False, reset: bool = False, force: bool = False) -> str:
+    """Download, rebase, migrate and stamp the travel DB, returning its path.
+
+    Cheap when the stamp says the DB is already prepared; pass ``force`` to redo the work
+    anyway, ``reset`` to restore from the backup or ``overwrite`` to download it again.
+    """
+    global _db_path
+    with _lock:
+        if not (force or reset or overwrite) and is_prepared():
+            _db_path = local_file
+            return _db_path
+        stamp = _read_stamp()
+        if stamp is not None and stamp.get("version", 0) <= drifting_stamp_version:
+            reset = True
+        download_database(overwrite)
+        update_dates(local_file, reset=reset)
+        version = migrate_database(local_file)
+        with open(stamp_file, "w") as f:
+            json.dump(
+                {"version": stamp_version, "schema_version": version, "prepared_at": time.time()},
+                f,
+            )
+        _db_path = local_file
+        return _db_path
+
+
+def get_db() -> str:
+    """Path of the prepared travel DB, bootstrapping it on first use."""
+    return _db_path or prepare_database()
+
+
+def __getattr__(name):
+    # Keeps ``from .database import db`` working without preparing the DB at import time.
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare the travel assistant database.")
+    parser.add_argument("--overwrite", action="store_true", help="download the DB again")
+    parser.add_argument("--reset", action="store_true", help="restore the DB from its backup")
+    parser.add_argument("--force", action="store_true", help="ignore the prepared stamp")
+    args = parser.parse_args()
+    print(prepare_database(overwrite=args.overwrite, reset=args.reset, force=args.force))
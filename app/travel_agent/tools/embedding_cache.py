@@ -0,0 +1,131 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+_space = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Fold the variations that do not change a question: case, spacing and end punctuation."""
+    return _space.sub(" ", text).strip().rstrip("?!.").strip().lower()
+
+
+class EmbeddingCache:
+    """Bounded LRU of query embeddings and top-k results, optionally backed by a SQLite file.
+
+    Entries are keyed by the normalized query text and the embedding model (results also by the
+    corpus they were computed on and ``k``). With ``path`` set, misses fall through to a shared
+    on-disk tier, so processes serving the same corpus reuse each other's lookups.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+        # Every query looks up its results first and its embedding only on a results miss, so the
+        # two kinds are counted apart: summed, a cold query would count as two misses.
+        self._stats = {
+            kind: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0} for kind in ("results", "embedding")
+        }
+        self._puts = 0
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode = WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def _key(*parts) -> str:
+        return hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+    def _get(self, kind: str, key: str, decode):
+        stats = self._stats[kind]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                stats["memory_hits"] += 1
+                return self._entries[key]
+            row = None
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value FROM query_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                stats["misses"] += 1
+                return None
+            stats["disk_hits"] += 1
+            value = decode(row[0])
+            self._remember(key, value)
+            return value
+
+    def _put(self, kind: str, key: str, value, encoded: bytes):
+        with self._lock:
+            self._stats[kind]["puts"] += 1
+            self._puts += 1
+            self._remember(key, value)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, encoded, time.time()),
+                )
+                if self._puts % 256 == 0:
+                    self._disk.execute(
+                        "DELETE FROM query_cache WHERE key IN (SELECT key FROM query_cache "
+                        "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,),
+                    )
+
+    def _remember(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_embedding(self, model: str, query: str) -> Optional[np.ndarray]:
+        """The cached embedding of ``query``; the array is shared, so it is read-only."""
+        key = self._key("embedding", model, normalize_query(query))
+        return self._get("embedding", key, lambda blob: np.frombuffer(blob, dtype=np.float32))
+
+    def put_embedding(self, model: str, query: str, embedding) -> np.ndarray:
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        key = self._key("embedding", model, normalize_query(query))
+        self._put("embedding", key, embedding, embedding.tobytes())
+        return embedding
+
+    def get_results(self, model: str, corpus: str, query: str, k: int) -> Optional[list[tuple[int, float]]]:
+        """Cached ``(doc_index, similarity)`` pairs of an earlier top-``k`` lookup."""
+        key = self._key("results", model, corpus, k, normalize_query(query))
+        results = self._get("results", key, lambda blob: tuple(tuple(pair) for pair in json.loads(blob)))
+        return list(results) if results is not None else None
+
+    def put_results(self, model: str, corpus: str, query: str, k: int, results: list[tuple[int, float]]):
+        results = tuple((int(idx), float(score)) for idx, score in results)
+        key = self._key("results", model, corpus, k, normalize_query(query))
+        self._put("results", key, results, json.dumps(results).encode("utf-8"))
+
+    def stats(self) -> dict:
+        """Hits, misses and puts of the ``results`` and ``embedding`` lookups, each with its hit rate.
+
+        The results hit rate is the share of queries answered without ranking; the embedding one
+        the share of the remaining queries answered without calling the embedding API.
+        """
+        with self._lock:
+            stats = {kind: dict(counters) for kind, counters in self._stats.items()}
+            stats["entries"] = len(self._entries)
+        for kind in ("results", "embedding"):
+            counters = stats[kind]
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            counters["hit_rate"] = (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0
+        return stats
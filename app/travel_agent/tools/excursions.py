@@ -1,8 +1,12 @@
 from typing import Optional
 from langchain_core.tools import tool
-# from .database import db
-import sqlite3
-from app.travel_agent.tools.database import db
+from app.travel_agent.tools.connection import update_row
+from app.travel_agent.tools.search import (default_page_size, match_expression, paginate,
+                                           text_search_query)
+
+# Columns returned by the search tool; the free-text ones are only previewed in the results.
+trip_recommendation_columns = ["id", "name", "location", "keywords", "details", "booked"]
+trip_recommendation_previews = ["keywords", "details"]
 
 
 @tool
@@ -10,7 +14,9 @@ def search_trip_recommendations(
     location: Optional[str] = None,
     name: Optional[str] = None,
     keywords: Optional[str] = None,
-) -> list[dict]:
+    page_size: int = default_page_size,
+    cursor: Optional[str] = None,
+) -> dict:
     """
     Search for trip recommendations based on location, name, and keywords.
 
@@ -18,36 +24,22 @@ def search_trip_recommendations(
         location (Optional[str]): The location of the trip recommendation. Defaults to None.
         name (Optional[str]): The name of the trip recommendation. Defaults to None.
         keywords (Optional[str]): The keywords associated with the trip recommendation. Defaults to None.
+        page_size (int): The number of results per page. Defaults to 10, at most 50.
+        cursor (Optional[str]): The next_cursor of a previous page to continue from. Defaults to None.
 
     Returns:
-        list[dict]: A list of trip recommendation dictionaries matching the search criteria.
+        dict: A page of trip recommendations matching the search criteria, best matches first, as "rows" under a
+        shared "columns" header, with the "total" number of matches and the "next_cursor" for the next page.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM trip_recommendations WHERE 1=1"
-    params = []
-
-    if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
-    if name:
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
-    if keywords:
-        keyword_list = keywords.split(",")
-        keyword_conditions = " OR ".join(["keywords LIKE ?" for _ in keyword_list])
-        query += f" AND ({keyword_conditions})"
-        params.extend([f"%{keyword.strip()}%" for keyword in keyword_list])
-
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-
-    conn.close()
-
-    return [
-        dict(zip([column[0] for column in cursor.description], row)) for row in results
-    ]
+    match = match_expression(
+        all_of={"location": location, "name": name},
+        any_of={"keywords": keywords.split(",") if keywords else None},
+    )
+    query, params = text_search_query(
+        "trip_recommendations", match, columns=trip_recommendation_columns,
+        previews=trip_recommendation_previews,
+    )
+    return paginate(query, params, page_size, cursor)
 
 
 @tool
@@ -61,19 +53,11 @@ def book_excursion(recommendation_id: int) -> str:
     Returns:
         str: A message indicating whether the trip recommendation was successfully booked or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "UPDATE trip_recommendations SET booked = 1 WHERE id = ?", (recommendation_id,)
-    )
-    conn.commit()
+    rowcount = update_row("trip_recommendations", recommendation_id, {"booked": 1})
 
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Trip recommendation {recommendation_id} successfully booked."
     else:
-        conn.close()
         return f"No trip recommendation found with ID {recommendation_id}."
 
 
@@ -89,20 +73,11 @@ def update_excursion(recommendation_id: int, details: str) -> str:
     Returns:
         str: A message indicating whether the trip recommendation was successfully updated or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
+    rowcount = update_row("trip_recommendations", recommendation_id, {"details": details})
 
-    cursor.execute(
-        "UPDATE trip_recommendations SET details = ? WHERE id = ?",
-        (details, recommendation_id),
-    )
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Trip recommendation {recommendation_id} successfully updated."
     else:
-        conn.close()
         return f"No trip recommendation found with ID {recommendation_id}."
 
 
@@ -117,17 +92,9 @@ def cancel_excursion(recommendation_id: int) -> str:
     Returns:
         str: A message indicating whether the trip recommendation was successfully cancelled or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "UPDATE trip_recommendations SET booked = 0 WHERE id = ?", (recommendation_id,)
-    )
-    conn.commit()
+    rowcount = update_row("trip_recommendations", recommendation_id, {"booked": 0})
 
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Trip recommendation {recommendation_id} successfully cancelled."
     else:
-        conn.close()
         return f"No trip recommendation found with ID {recommendation_id}."
\ No newline at end of file
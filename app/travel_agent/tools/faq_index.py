@@ -0,0 +1,122 @@
+import argparse
+import hashlib
+import json
+import os
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from .chunking import default_max_tokens, default_overlap, iter_chunks
+
+faq_url = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md"
+embedding_model = "text-embedding-3-small"
+# Bump when the layout of the artifact changes; older artifacts are then rebuilt from scratch.
+format_version = 2
+faq_index_dir = "faq_index"
+manifest_name = "manifest.json"
+vectors_name = "vectors.npy"
+
+
+def fetch_faq() -> Iterator[str]:
+    """Stream the FAQ markdown line by line."""
+    import requests
+
+    with requests.get(faq_url, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        yield from response.iter_lines(decode_unicode=True)
+
+
+def split_faq(
+    faq: str | Iterable[str], max_tokens: int = default_max_tokens, overlap: int = default_overlap
+) -> list[dict]:
+    """Token-bounded chunks of the FAQ, given as text or as an iterable of lines."""
+    lines = faq.splitlines(keepends=True) if isinstance(faq, str) else faq
+    return list(iter_chunks(lines, max_tokens, overlap))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_faq_index(path: str = faq_index_dir) -> Optional[tuple[dict, np.ndarray]]:
+    """Return the artifact's manifest and its memory-mapped float32 vectors, or None if missing.
+
+    Artifacts written with another ``format_version`` are treated as missing.
+    """
+    try:
+        with open(os.path.join(path, manifest_name)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != format_version:
+        return None
+    vectors = np.load(os.path.join(path, vectors_name), mmap_mode="r")
+    return manifest, vectors
+
+
+def build_faq_index(
+    oai_client, faq_text: Optional[str] = None, path: str = faq_index_dir
+) -> tuple[dict, np.ndarray]:
+    """Write the FAQ index artifact to ``path`` and return it as ``load_faq_index`` would.
+
+    Sections whose content hash is already in the previous artifact (for the same model) keep
+    their vectors; only new or edited sections are sent to the embeddings API.
+    """
+    docs = split_faq(faq_text if faq_text is not None else fetch_faq())
+    hashes = [content_hash(doc["page_content"]) for doc in docs]
+
+    known = {}
+    previous = load_faq_index(path)
+    if previous is not None and previous[0]["model"] == embedding_model:
+        manifest, vectors = previous
+        known = {h: vectors[i] for i, h in enumerate(manifest["hashes"])}
+
+    missing = [i for i, h in enumerate(hashes) if h not in known]
+    if missing:
+        embeddings = oai_client.embeddings.create(
+            model=embedding_model, input=[docs[i]["page_content"] for i in missing]
+        )
+        for i, emb in zip(missing, embeddings.data):
+            known[hashes[i]] = np.asarray(emb.embedding, dtype=np.float32)
+    vectors = np.stack([np.asarray(known[h], dtype=np.float32) for h in hashes])
+
+    manifest = {
+        "format_version": format_version,
+        "model": embedding_model,
+        "dims": int(vectors.shape[1]),
+        "corpus_hash": content_hash("".join(hashes)),
+        "hashes": hashes,
+        "docs": docs,
+        "reused": len(docs) - len(missing),
+    }
+    # Write next to the old files and swap them in, so readers never see a half-written index.
+    os.makedirs(path, exist_ok=True)
+    tmp_vectors = os.path.join(path, vectors_name + ".tmp")
+    tmp_manifest = os.path.join(path, manifest_name + ".tmp")
+    with open(tmp_vectors, "wb") as f:
+        np.save(f, vectors)
+    with open(tmp_manifest, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_vectors, os.path.join(path, vectors_name))
+    os.replace(tmp_manifest, os.path.join(path, manifest_name))
+    return load_faq_index(path)
+
+
+if __name__ == "__main__":
+    import openai
+
+    parser = argparse.ArgumentParser(description="Build the FAQ embedding index artifact.")
+    parser.add_argument("--faq", help="local markdown file to index instead of downloading it")
+    parser.add_argument("--path", default=faq_index_dir, help="directory to write the artifact to")
+    args = parser.parse_args()
+    faq_text = None
+    if args.faq:
+        with open(args.faq) as f:
+            faq_text = f.read()
+    # The API key comes from OPENAI_API_KEY.
+    manifest, vectors = build_faq_index(openai.Client(), faq_text, args.path)
+    print(
+        f"{len(manifest['docs'])} sections ({manifest['reused']} reused), "
+        f"corpus {manifest['corpus_hash'][:12]}, {vectors.shape} {vectors.dtype}"
+    )
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import date, datetime, timezone
+from datetime import time as day_time
+from typing import Optional
+
+import numpy as np
+
+from .connection import connection
+
+# Keys a flight is filed under; None stands for "any airport".
+Key = tuple[Optional[str], Optional[str]]
+
+
+def _keys(departure_airport: str, arrival_airport: str) -> list[Key]:
+    return [
+        (departure_airport, arrival_airport),
+        (departure_airport, None),
+        (None, arrival_airport),
+        (None, None),
+    ]
+
+
+def to_epoch(value: date | datetime | str, end: bool = False) -> float:
+    """Wall-clock seconds since the epoch for a search bound.
+
+    Like the SQL path of ``search_flights``, which compares bounds with the departure text, a
+    bound is matched against the local departure time of each flight: any UTC offset of the
+    bound is ignored. A plain date covers the whole day (its start, or its last instant when
+    ``end``).
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if len(value) > 10 else date.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, day_time.max if end else day_time.min)
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class FlightIndex:
+    """In-memory copy of ``flights`` answering ``search_flights`` by binary search.
+
+    For every (departure, arrival) pair, and for each airport on its own, it keeps the flight ids
+    in a NumPy array sorted by the local (wall-clock) departure time. It polls the trigger-maintained
+    ``flight_changes`` log at most every ``max_staleness`` seconds and patches only the flights
+    that changed, falling back to a full rebuild when most of the table did (e.g. a date rebase).
+    """
+
+    def __init__(self, max_staleness: float = 1.0, rebuild_fraction: float = 0.25):
+        self.max_staleness = max_staleness
+        self.rebuild_fraction = rebuild_fraction
+        self._lock = threading.Lock()
+        self._rows: dict[int, dict] = {}
+        self._epochs: dict[int, float] = {}
+        self._sorted: dict[Key, tuple[np.ndarray, np.ndarray]] = {}
+        self._seq: Optional[int] = None
+        self._checked_at = 0.0
+
+    def _load(self, where: str = "", params=()) -> list[tuple[float, dict]]:
+        cursor = connection().execute(
+            # Local departure time, as the text comparisons of the SQL path see it.
+            "SELECT round((julianday(substr(scheduled_departure, 1, 19)) - 2440587.5) * 86400.0, 3), * "
+            "FROM flights " + where,
+            params,
+        )
+        names = [column[0] for column in cursor.description[1:]]
+        return [
+            (np.inf if epoch is None else epoch, dict(zip(names, row)))
+            for epoch, *row in cursor.fetchall()
+        ]
+
+    def rebuild(self):
+        with self._lock:
+            (seq,) = connection().execute(
+                "SELECT coalesce(max(seq), 0) FROM flight_changes"
+            ).fetchone()
+            loaded = self._load()
+            self._rows = {row["flight_id"]: row for _, row in loaded}
+            self._epochs = {row["flight_id"]: epoch for epoch, row in loaded}
+            grouped: dict[Key, list[int]] = {}
+            for row in self._rows.values():
+                for key in _keys(row["departure_airport"], row["arrival_airport"]):
+                    grouped.setdefault(key, []).append(row["flight_id"])
+            sorted_keys = {}
+            for key, flight_ids in grouped.items():
+                ids = np.array(flight_ids, dtype=np.int64)
+                epochs = np.array([self._epochs[i] for i in flight_ids], dtype=np.float64)
+                order = np.argsort(epochs, kind="stable")
+                sorted_keys[key] = (epochs[order], ids[order])
+            self._sorted = sorted_keys
+            self._seq = seq
+            self._checked_at = time.monotonic()
+
+    def _remove(self, flight_id: int):
+        row = self._rows.pop(flight_id, None)
+        self._epochs.pop(flight_id, None)
+        if row is None:
+            return
+        for key in _keys(row["departure_airport"], row["arrival_airport"]):
+            epochs, ids = self._sorted[key]
+            keep = ids != flight_id
+            self._sorted[key] = (epochs[keep], ids[keep])
+
+    def _insert(self, epoch: float, row: dict):
+        flight_id = row["flight_id"]
+        self._rows[flight_id] = row
+        self._epochs[flight_id] = epoch
+        for key in _keys(row["departure_airport"], row["arrival_airport"]):
+            epochs, ids = self._sorted.get(key, (np.empty(0), np.empty(0, dtype=np.int64)))
+            position = np.searchsorted(epochs, epoch, side="right")
+            self._sorted[key] = (
+                np.insert(epochs, position, epoch),
+                np.insert(ids, position, flight_id),
+            )
+
+    def refresh(self):
+        """Apply the flight changes logged since the last refresh, if the index may be stale."""
+        if self._seq is None:
+            return self.rebuild()
+        if time.monotonic() - self._checked_at < self.max_staleness:
+            return
+        with self._lock:
+            changes = connection().execute(
+                "SELECT seq, flight_id FROM flight_changes WHERE seq > ?", (self._seq,)
+            ).fetchall()
+            self._checked_at = time.monotonic()
+            if not changes:
+                return
+            rebuild = len(changes) > self.rebuild_fraction * max(len(self._rows), 1)
+            if not rebuild:
+                self._seq = max(seq for seq, _ in changes)
+                changed = [flight_id for _, flight_id in changes]
+                placeholders = ", ".join("?" * len(changed))
+                loaded = self._load(f"WHERE flight_id IN ({placeholders})", changed)
+                for flight_id in changed:
+                    self._remove(flight_id)
+                for epoch, row in loaded:
+                    self._insert(epoch, row)
+        if rebuild:
+            self.rebuild()
+
+    def search(
+        self,
+        departure_airport: Optional[str] = None,
+        arrival_airport: Optional[str] = None,
+        start_time: Optional[date | datetime | str] = None,
+        end_time: Optional[date | datetime | str] = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Flights on the route departing within ``[start_time, end_time]``, earliest first."""
+        self.refresh()
+        start = to_epoch(start_time) if start_time else None
+        end = to_epoch(end_time, end=True) if end_time else None
+        # A concurrent refresh rebinds the arrays and drops rows, so read both under the lock.
+        with self._lock:
+            found = self._sorted.get((departure_airport or None, arrival_airport or None))
+            if found is None:
+                return []
+            epochs, ids = found
+            lo = np.searchsorted(epochs, start, side="left") if start is not None else 0
+            hi = np.searchsorted(epochs, end, side="right") if end is not None else len(ids)
+            return [dict(self._rows[i]) for i in ids[lo:min(hi, lo + max(limit, 0))].tolist()]
+
+
+flight_index = FlightIndex()
@@ -1,12 +1,11 @@
-import sqlite3
 from datetime import date, datetime
 from typing import Optional
 import pytz
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from .database import db
-
-
+from app.travel_agent.config import FLIGHT_INDEX
+from .connection import fetch_all, write
+from .flight_index import flight_index
 
 
 @tool
@@ -22,31 +21,17 @@ def fetch_user_flight_information(config: RunnableConfig) -> list[dict]:
     if not passenger_id:
         raise ValueError("No passenger ID configured.")
 
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
+    # passenger_itinerary is kept in sync with tickets, ticket_flights, flights and
+    # boarding_passes by triggers (see migrations), so this is a single primary key range read.
     query = """
-    SELECT 
-        t.ticket_no, t.book_ref,
-        f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport, f.scheduled_departure, f.scheduled_arrival,
-        bp.seat_no, tf.fare_conditions
-    FROM 
-        tickets t
-        JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
-        JOIN flights f ON tf.flight_id = f.flight_id
-        JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
-    WHERE 
-        t.passenger_id = ?
+    SELECT
+        ticket_no, book_ref,
+        flight_id, flight_no, departure_airport, arrival_airport, scheduled_departure, scheduled_arrival,
+        seat_no, fare_conditions
+    FROM passenger_itinerary
+    WHERE passenger_id = ?
     """
-    cursor.execute(query, (passenger_id,))
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
-
-    cursor.close()
-    conn.close()
-
-    return results
+    return fetch_all(query, (passenger_id,))
 
 
 @tool
@@ -58,8 +43,8 @@ def search_flights(
     limit: int = 20,
 ) -> list[dict]:
     """Search for flights based on departure airport, arrival airport, and departure time range."""
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
+    if FLIGHT_INDEX:
+        return flight_index.search(departure_airport, arrival_airport, start_time, end_time, limit)
 
     query = "SELECT * FROM flights WHERE 1 = 1"
     params = []
@@ -81,15 +66,7 @@ def search_flights(
         params.append(end_time)
     query += " LIMIT ?"
     params.append(limit)
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
-
-    cursor.close()
-    conn.close()
-
-    return results
+    return fetch_all(query, params)
 
 
 @tool
@@ -102,63 +79,48 @@ def update_ticket_to_new_flight(
     if not passenger_id:
         raise ValueError("No passenger ID configured.")
 
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?",
-        (new_flight_id,),
-    )
-    new_flight = cursor.fetchone()
-    if not new_flight:
-        cursor.close()
-        conn.close()
-        return "Invalid new flight ID provided."
-    column_names = [column[0] for column in cursor.description]
-    new_flight_dict = dict(zip(column_names, new_flight))
-    timezone = pytz.timezone("Etc/GMT-3")
-    current_time = datetime.now(tz=timezone)
-    departure_time = datetime.strptime(
-        new_flight_dict["scheduled_departure"], "%Y-%m-%d %H:%M:%S.%f%z"
-    )
-    time_until = (departure_time - current_time).total_seconds()
-    if time_until < (3 * 3600):
-        return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time. Selected flight is at {departure_time}."
-
-    cursor.execute(
-        "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)
-    )
-    current_flight = cursor.fetchone()
-    if not current_flight:
-        cursor.close()
-        conn.close()
-        return "No existing ticket found for the given ticket number."
-
-    # Check the signed-in user actually has this ticket
-    cursor.execute(
-        "SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-        (ticket_no, passenger_id),
-    )
-    current_ticket = cursor.fetchone()
-    if not current_ticket:
-        cursor.close()
-        conn.close()
-        return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
-
-    # In a real application, you'd likely add additional checks here to enforce business logic,
-    # like "does the new departure airport match the current ticket", etc.
-    # While it's best to try to be *proactive* in 'type-hinting' policies to the LLM
-    # it's inevitably going to get things wrong, so you **also** need to ensure your
-    # API enforces valid behavior
-    cursor.execute(
-        "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
-        (new_flight_id, ticket_no),
-    )
-    conn.commit()
-
-    cursor.close()
-    conn.close()
-    return "Ticket successfully updated to new flight."
+    def reschedule(conn) -> str:
+        new_flight = conn.execute(
+            "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?",
+            (new_flight_id,),
+        ).fetchone()
+        if not new_flight:
+            return "Invalid new flight ID provided."
+        timezone = pytz.timezone("Etc/GMT-3")
+        current_time = datetime.now(tz=timezone)
+        departure_time = datetime.strptime(new_flight[2], "%Y-%m-%d %H:%M:%S.%f%z")
+        time_until = (departure_time - current_time).total_seconds()
+        if time_until < (3 * 3600):
+            return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time. Selected flight is at {departure_time}."
+
+        current_flight = conn.execute(
+            "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)
+        ).fetchone()
+        if not current_flight:
+            return "No existing ticket found for the given ticket number."
+
+        # Check the signed-in user actually has this ticket
+        current_ticket = conn.execute(
+            "SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
+            (ticket_no, passenger_id),
+        ).fetchone()
+        if not current_ticket:
+            return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
+
+        # In a real application, you'd likely add additional checks here to enforce business logic,
+        # like "does the new departure airport match the current ticket", etc.
+        # While it's best to try to be *proactive* in 'type-hinting' policies to the LLM
+        # it's inevitably going to get things wrong, so you **also** need to ensure your
+        # API enforces valid behavior
+        conn.execute(
+            "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
+            (new_flight_id, ticket_no),
+        )
+        return "Ticket successfully updated to new flight."
+
+    # The flight checks, the ownership checks and the write share one transaction, retried if the
+    # DB is busy.
+    return write(reschedule)
 
 
 @tool
@@ -168,32 +130,23 @@ def cancel_ticket(ticket_no: str, *, config: RunnableConfig) -> str:
     passenger_id = configuration.get("passenger_id", None)
     if not passenger_id:
         raise ValueError("No passenger ID configured.")
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)
-    )
-    existing_ticket = cursor.fetchone()
-    if not existing_ticket:
-        cursor.close()
-        conn.close()
-        return "No existing ticket found for the given ticket number."
-
-    # Check the signed-in user actually has this ticket
-    cursor.execute(
-        "SELECT ticket_no FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-        (ticket_no, passenger_id),
-    )
-    current_ticket = cursor.fetchone()
-    if not current_ticket:
-        cursor.close()
-        conn.close()
-        return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
-
-    cursor.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-    conn.commit()
-
-    cursor.close()
-    conn.close()
-    return "Ticket successfully cancelled."
+
+    def cancel(conn) -> str:
+        existing_ticket = conn.execute(
+            "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)
+        ).fetchone()
+        if not existing_ticket:
+            return "No existing ticket found for the given ticket number."
+
+        # Check the signed-in user actually has this ticket
+        current_ticket = conn.execute(
+            "SELECT ticket_no FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
+            (ticket_no, passenger_id),
+        ).fetchone()
+        if not current_ticket:
+            return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
+
+        conn.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
+        return "Ticket successfully cancelled."
+
+    return write(cancel)
@@ -1,8 +1,13 @@
-import sqlite3
 from datetime import date, datetime
 from typing import Optional, Union
 from langchain_core.tools import tool
-from .database import db
+from .connection import update_row
+from .search import (availability_conditions, default_page_size, match_expression, paginate,
+                     text_search_query)
+
+# Columns returned by the search tool, in a fixed order. All of them are short, so none is cut;
+# columns added to the table later stay out of the results until they are listed here.
+hotel_columns = ["id", "name", "location", "price_tier", "checkin_date", "checkout_date", "booked"]
 
 
 @tool
@@ -12,7 +17,9 @@ def search_hotels(
     price_tier: Optional[str] = None,
     checkin_date: Optional[Union[datetime, date]] = None,
     checkout_date: Optional[Union[datetime, date]] = None,
-) -> list[dict]:
+    page_size: int = default_page_size,
+    cursor: Optional[str] = None,
+) -> dict:
     """
     Search for hotels based on location, name, price tier, check-in date, and check-out date.
 
@@ -22,31 +29,21 @@ def search_hotels(
         price_tier (Optional[str]): The price tier of the hotel. Defaults to None. Examples: Midscale, Upper Midscale, Upscale, Luxury
         checkin_date (Optional[Union[datetime, date]]): The check-in date of the hotel. Defaults to None.
         checkout_date (Optional[Union[datetime, date]]): The check-out date of the hotel. Defaults to None.
+        page_size (int): The number of results per page. Defaults to 10, at most 50.
+        cursor (Optional[str]): The next_cursor of a previous page to continue from. Defaults to None.
 
     Returns:
-        list[dict]: A list of hotel dictionaries matching the search criteria.
+        dict: A page of hotels matching the search criteria, best matches first, as "rows" under a
+        shared "columns" header, with the "total" number of matches and the "next_cursor" for the next page.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM hotels WHERE 1=1"
-    params = []
-
-    if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
-    if name:
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
-    # For the sake of this tutorial, we will let you match on any dates and price tier.
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-
-    conn.close()
-
-    return [
-        dict(zip([column[0] for column in cursor.description], row)) for row in results
-    ]
+    match = match_expression(all_of={"location": location, "name": name})
+    # Keep only options available for (part of) the requested dates in the requested tier.
+    conditions, params = availability_conditions("checkin_date", "checkout_date", checkin_date, checkout_date)
+    if price_tier:
+        conditions.append("t.price_tier = ? COLLATE NOCASE")
+        params.append(price_tier)
+    query, params = text_search_query("hotels", match, conditions, params, columns=hotel_columns)
+    return paginate(query, params, page_size, cursor)
 
 
 @tool
@@ -60,17 +57,11 @@ def book_hotel(hotel_id: int) -> str:
     Returns:
         str: A message indicating whether the hotel was successfully booked or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE hotels SET booked = 1 WHERE id = ?", (hotel_id,))
-    conn.commit()
+    rowcount = update_row("hotels", hotel_id, {"booked": 1})
 
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Hotel {hotel_id} successfully booked."
     else:
-        conn.close()
         return f"No hotel found with ID {hotel_id}."
 
 
@@ -91,26 +82,13 @@ def update_hotel(
     Returns:
         str: A message indicating whether the hotel was successfully updated or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    if checkin_date:
-        cursor.execute(
-            "UPDATE hotels SET checkin_date = ? WHERE id = ?", (checkin_date, hotel_id)
-        )
-    if checkout_date:
-        cursor.execute(
-            "UPDATE hotels SET checkout_date = ? WHERE id = ?",
-            (checkout_date, hotel_id),
-        )
-
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
+    rowcount = update_row(
+        "hotels", hotel_id, {"checkin_date": checkin_date, "checkout_date": checkout_date}
+    )
+
+    if rowcount > 0:
         return f"Hotel {hotel_id} successfully updated."
     else:
-        conn.close()
         return f"No hotel found with ID {hotel_id}."
 
 
@@ -125,15 +103,9 @@ def cancel_hotel(hotel_id: int) -> str:
     Returns:
         str: A message indicating whether the hotel was successfully cancelled or not.
     """
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE hotels SET booked = 0 WHERE id = ?", (hotel_id,))
-    conn.commit()
+    rowcount = update_row("hotels", hotel_id, {"booked": 0})
 
-    if cursor.rowcount > 0:
-        conn.close()
+    if rowcount > 0:
         return f"Hotel {hotel_id} successfully cancelled."
     else:
-        conn.close()
         return f"No hotel found with ID {hotel_id}."
\ No newline at end of file
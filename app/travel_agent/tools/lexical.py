@@ -0,0 +1,58 @@
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+_token = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _token.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index over ``docs`` with the BM25 weight of every posting computed up front.
+
+    Scoring a query is then a sum of precomputed weights over the postings of its terms, with no
+    per-query length normalization or IDF work.
+    """
+
+    def __init__(self, docs: list[dict], k1: float = 1.5, b: float = 0.75):
+        self.size = len(docs)
+        term_counts = [Counter(tokenize(doc["page_content"])) for doc in docs]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.size else 0.0
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in postings.items():
+            ids = np.array([doc_id for doc_id, _ in entries], dtype=np.int32)
+            tf = np.array([tf for _, tf in entries], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / avg_length)
+            self._postings[term] = (ids, idf * tf * (k1 + 1) / (tf + norm))
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every doc for ``query``; docs sharing no term with it score 0."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                ids, weights = posting
+                scores[ids] += weights
+        return scores
+
+    @staticmethod
+    def confidence(scores: np.ndarray) -> float:
+        """How clearly the best match wins: 0 without any match, 1 when it is the only one."""
+        if scores.size == 0:
+            return 0.0
+        if scores.size == 1:
+            return 1.0 if scores[0] > 0 else 0.0
+        second, first = np.partition(scores, -2)[-2:]
+        return float((first - second) / first) if first > 0 else 0.0
@@ -0,0 +1,162 @@
+import sqlite3
+
+
+def _fts_statements(table: str, columns: list[str]) -> list[str]:
+    """Create ``<table>_fts`` over ``columns`` (rowid = ``id``) and triggers keeping it in sync."""
+    fts = f"{table}_fts"
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_id ON {table} (id)",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column_list}, tokenize = 'unicode61 remove_diacritics 2')",
+        f"DELETE FROM {fts}",
+        f"INSERT INTO {fts} (rowid, {column_list}) SELECT id, {column_list} FROM {table}",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF id, {column_list} ON {table} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; "
+        f"INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+# The per-passenger rows fetch_user_flight_information used to assemble with a four-way join.
+_itinerary_select = """
+    SELECT
+        t.passenger_id, t.ticket_no, t.book_ref,
+        f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport, f.scheduled_departure, f.scheduled_arrival,
+        bp.seat_no, tf.fare_conditions
+    FROM
+        tickets t
+        JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
+        JOIN flights f ON tf.flight_id = f.flight_id
+        JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
+"""
+
+
+def _refresh_itinerary(ticket_no: str) -> str:
+    """Trigger body statements rebuilding the itinerary rows of one ticket."""
+    return (
+        f"DELETE FROM passenger_itinerary WHERE ticket_no = {ticket_no}; "
+        f"INSERT OR REPLACE INTO passenger_itinerary {_itinerary_select} WHERE t.ticket_no = {ticket_no}; "
+    )
+
+
+def _itinerary_statements() -> list[str]:
+    statements = [
+        "CREATE TABLE IF NOT EXISTS passenger_itinerary ("
+        "passenger_id TEXT NOT NULL, ticket_no TEXT NOT NULL, book_ref TEXT, "
+        "flight_id INTEGER NOT NULL, flight_no TEXT, departure_airport TEXT, arrival_airport TEXT, "
+        "scheduled_departure TEXT, scheduled_arrival TEXT, seat_no TEXT, fare_conditions TEXT, "
+        "PRIMARY KEY (passenger_id, ticket_no, flight_id)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_passenger_itinerary_ticket ON passenger_itinerary (ticket_no)",
+        "CREATE INDEX IF NOT EXISTS idx_passenger_itinerary_flight ON passenger_itinerary (flight_id)",
+        "DELETE FROM passenger_itinerary",
+        f"INSERT OR REPLACE INTO passenger_itinerary {_itinerary_select}",
+    ]
+    # Any change to a ticket, its flight legs or boarding passes rebuilds that ticket's rows.
+    for table in ["tickets", "ticket_flights", "boarding_passes"]:
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_itinerary_insert AFTER INSERT ON {table} BEGIN "
+            f"{_refresh_itinerary('new.ticket_no')}END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_itinerary_delete AFTER DELETE ON {table} BEGIN "
+            f"{_refresh_itinerary('old.ticket_no')}END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_itinerary_update AFTER UPDATE ON {table} BEGIN "
+            f"{_refresh_itinerary('old.ticket_no')}{_refresh_itinerary('new.ticket_no')}END",
+        ]
+    # Flight changes (e.g. a date rebase) are copied onto the itinerary rows that reference them.
+    statements += [
+        "CREATE TRIGGER IF NOT EXISTS flights_itinerary_update AFTER UPDATE OF "
+        "flight_no, departure_airport, arrival_airport, scheduled_departure, scheduled_arrival "
+        "ON flights BEGIN "
+        "UPDATE passenger_itinerary SET flight_no = new.flight_no, "
+        "departure_airport = new.departure_airport, arrival_airport = new.arrival_airport, "
+        "scheduled_departure = new.scheduled_departure, scheduled_arrival = new.scheduled_arrival "
+        "WHERE flight_id = new.flight_id; END",
+        "CREATE TRIGGER IF NOT EXISTS flights_itinerary_delete AFTER DELETE ON flights BEGIN "
+        "DELETE FROM passenger_itinerary WHERE flight_id = old.flight_id; END",
+    ]
+    return statements
+
+
+# Each entry is one schema version; the DB records the last applied one in PRAGMA user_version.
+# Append new versions at the end and never edit a released one.
+migrations: list[list[str]] = [
+    # 1: indexes backing the flight tool queries
+    [
+        # fetch_user_flight_information: tickets by passenger, then join on ticket_no / flight_id
+        "CREATE INDEX IF NOT EXISTS idx_tickets_passenger ON tickets (passenger_id, ticket_no)",
+        # ownership checks in update_ticket_to_new_flight / cancel_ticket
+        "CREATE INDEX IF NOT EXISTS idx_tickets_ticket_no ON tickets (ticket_no, passenger_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ticket_flights_ticket ON ticket_flights (ticket_no, flight_id)",
+        "CREATE INDEX IF NOT EXISTS idx_boarding_passes_ticket ON boarding_passes (ticket_no, flight_id)",
+        "CREATE INDEX IF NOT EXISTS idx_flights_flight_id ON flights (flight_id)",
+        # search_flights: airport equality filters plus a scheduled_departure range
+        "CREATE INDEX IF NOT EXISTS idx_flights_route_departure "
+        "ON flights (departure_airport, arrival_airport, scheduled_departure)",
+        "CREATE INDEX IF NOT EXISTS idx_flights_arrival_departure "
+        "ON flights (arrival_airport, scheduled_departure)",
+        "ANALYZE",
+    ],
+    # 2: FTS5 indexes for the hotel, car rental and trip recommendation text searches
+    [
+        *_fts_statements("hotels", ["name", "location"]),
+        *_fts_statements("car_rentals", ["name", "location"]),
+        *_fts_statements("trip_recommendations", ["name", "location", "keywords", "details"]),
+    ],
+    # 3: trigger-maintained itinerary table read by fetch_user_flight_information
+    _itinerary_statements(),
+    # 4: price tier and availability window filters of search_hotels / search_car_rentals
+    [
+        "CREATE INDEX IF NOT EXISTS idx_hotels_tier_checkin "
+        "ON hotels (price_tier COLLATE NOCASE, checkin_date, checkout_date)",
+        "CREATE INDEX IF NOT EXISTS idx_hotels_checkin ON hotels (checkin_date, checkout_date)",
+        "CREATE INDEX IF NOT EXISTS idx_car_rentals_tier_start "
+        "ON car_rentals (price_tier COLLATE NOCASE, start_date, end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_car_rentals_start ON car_rentals (start_date, end_date)",
+        "ANALYZE",
+    ],
+    # 5: change log of flights, polled by the in-memory flight index to refresh incrementally.
+    # REPLACE moves a flight that changes again to a new seq, so the log holds one row per flight.
+    [
+        "CREATE TABLE IF NOT EXISTS flight_changes ("
+        "seq INTEGER PRIMARY KEY AUTOINCREMENT, flight_id INTEGER NOT NULL UNIQUE)",
+        "CREATE TRIGGER IF NOT EXISTS flights_changes_insert AFTER INSERT ON flights BEGIN "
+        "INSERT OR REPLACE INTO flight_changes (flight_id) VALUES (new.flight_id); END",
+        "CREATE TRIGGER IF NOT EXISTS flights_changes_update AFTER UPDATE ON flights BEGIN "
+        "INSERT OR REPLACE INTO flight_changes (flight_id) VALUES (old.flight_id); "
+        "INSERT OR REPLACE INTO flight_changes (flight_id) VALUES (new.flight_id); END",
+        "CREATE TRIGGER IF NOT EXISTS flights_changes_delete AFTER DELETE ON flights BEGIN "
+        "INSERT OR REPLACE INTO flight_changes (flight_id) VALUES (old.flight_id); END",
+    ],
+]
+
+latest_version = len(migrations)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply every pending migration, each in its own transaction, and return the new version.
+
+    Safe to call on every bootstrap: an up-to-date DB only costs the ``user_version`` read.
+    ``conn`` must be in autocommit mode (``isolation_level=None``).
+    """
+    current = schema_version(conn)
+    for version in range(current + 1, latest_version + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in migrations[version - 1]:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        current = version
+    conn.execute("PRAGMA optimize")
+    return current
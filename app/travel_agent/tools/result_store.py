@@ -0,0 +1,211 @@
+import hashlib
+import json
+import threading
+import time
+import zlib
+from typing import Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+
+from app.travel_agent.config import RESULT_INLINE_CHARS, RESULT_STORE_PATH, RESULT_TTL_HOURS
+from .connection import ConnectionManager
+
+preview_rows = 3
+max_fetch_rows = 50
+
+schema = """CREATE TABLE IF NOT EXISTS tool_results (
+    handle TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    thread_id TEXT NOT NULL DEFAULT ''
+)"""
+# Columns added after the first release of the table, for files created before them.
+added_columns = {
+    "thread_id": "TEXT NOT NULL DEFAULT ''",
+}
+
+
+def _table(payload) -> Optional[tuple[list[str], list[list], dict]]:
+    """``(columns, rows, extra)`` of a tabular tool result, or None for anything else.
+
+    Handles both a list of records (``search_flights``) and a page with ``columns`` and ``rows``
+    (the other search tools); ``extra`` holds the remaining keys of a page, e.g. its cursor.
+    """
+    if isinstance(payload, dict) and isinstance(payload.get("rows"), list) and "columns" in payload:
+        extra = {key: value for key, value in payload.items() if key not in ("columns", "rows")}
+        return payload["columns"], payload["rows"], extra
+    if isinstance(payload, list) and payload and all(isinstance(row, dict) for row in payload):
+        columns = list(dict.fromkeys(key for row in payload for key in row))
+        return columns, [[row.get(column) for column in columns] for row in payload], {}
+    return None
+
+
+class ResultStore:
+    """Keeps large tool results out of the conversation.
+
+    ``offload`` swaps the content of an oversized ToolMessage for a short summary with a handle;
+    ``fetch`` reads rows (or lines, for non-tabular results) back by handle. Results live in a
+    SQLite table shared by all worker processes and expire after ``ttl_seconds``. Each result
+    belongs to the conversation (thread) that produced it, and only that thread can fetch it.
+    """
+
+    def __init__(self, path: str, max_inline_chars: int = 2000, ttl_seconds: float = 24 * 3600):
+        self.max_inline_chars = max_inline_chars
+        self.ttl_seconds = ttl_seconds
+        self._db = ConnectionManager(lambda: path)
+        conn = self._db.connection()
+        conn.execute(schema)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(tool_results)")}
+        for column, definition in added_columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE tool_results ADD COLUMN {column} {definition}")
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def put(self, tool_name: str, content: str, thread_id: str = "") -> str:
+        # The thread is part of the key, so the same result in two conversations gets two handles.
+        handle = "res_" + hashlib.sha256(f"{thread_id}\x1f{content}".encode("utf-8")).hexdigest()[:12]
+        self._db.write(
+            lambda conn: conn.execute(
+                "INSERT OR REPLACE INTO tool_results (handle, tool, payload, created_at, thread_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (handle, tool_name, zlib.compress(content.encode("utf-8")), time.time(), thread_id),
+            )
+        )
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % 256 == 0
+        if prune:
+            self._db.write(
+                lambda conn: conn.execute(
+                    "DELETE FROM tool_results WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+            )
+        return handle
+
+    def get(self, handle: str, thread_id: str = "") -> Optional[str]:
+        """The result stored under ``handle`` by ``thread_id``; None if missing or another thread's."""
+        row = self._db.fetch_one(
+            "SELECT payload FROM tool_results WHERE handle = ? AND thread_id = ?", (handle, thread_id)
+        )
+        return zlib.decompress(row["payload"]).decode("utf-8") if row else None
+
+    def offload(self, message: ToolMessage, thread_id: str = "") -> ToolMessage:
+        """``message`` itself if it is small, else a copy whose content summarizes it by handle."""
+        if not isinstance(message.content, str) or len(message.content) <= self.max_inline_chars:
+            return message
+        if message.name == fetch_tool_result.name:
+            return message
+        handle = self.put(message.name or "tool", message.content, thread_id)
+        try:
+            table = _table(json.loads(message.content))
+        except ValueError:
+            table = None
+        if table is None:
+            lines = message.content.count("\n") + 1
+            summary = (
+                f"The result ({len(message.content)} characters, {lines} lines) is stored under handle {handle!r}. "
+                f"It starts with:\n{message.content[:self.max_inline_chars // 2]}\n"
+                f"Call {fetch_tool_result.name} with this handle to read it by lines."
+            )
+        else:
+            columns, rows, extra = table
+            summary = json.dumps(
+                {
+                    "handle": handle,
+                    "stored_rows": len(rows),
+                    **extra,
+                    "columns": columns,
+                    "first_rows": rows[:preview_rows],
+                    "note": f"Call {fetch_tool_result.name} with this handle to read more rows or only some columns.",
+                },
+                ensure_ascii=False,
+                default=str,
+            )
+        return message.model_copy(update={"content": summary})
+
+    def fetch(
+        self,
+        handle: str,
+        offset: int = 0,
+        limit: int = 10,
+        columns: Optional[list[str]] = None,
+        thread_id: str = "",
+    ) -> dict:
+        content = self.get(handle, thread_id)
+        if content is None:
+            # Another thread's handle reads as missing, so it does not reveal that the result exists.
+            raise ValueError(
+                f"No stored result {handle!r} in this conversation; it may have expired. Run the search again."
+            )
+        offset, limit = max(0, offset), max(1, min(limit, max_fetch_rows))
+        try:
+            table = _table(json.loads(content))
+        except ValueError:
+            table = None
+        if table is None:
+            lines = content.splitlines()
+            return {"lines": lines[offset:offset + limit], "total_lines": len(lines), "offset": offset}
+        all_columns, rows, _ = table
+        picked = None
+        if columns:
+            picked = [all_columns.index(column) for column in columns if column in all_columns]
+            if not picked:
+                raise ValueError(
+                    f"None of the columns {columns} are in the stored result {handle!r}; "
+                    f"its columns are {all_columns}."
+                )
+        page = rows[offset:offset + limit]
+        return {
+            "columns": [all_columns[i] for i in picked] if picked is not None else all_columns,
+            "rows": [[row[i] for i in picked] for row in page] if picked is not None else page,
+            "total": len(rows),
+            "offset": offset,
+        }
+
+
+_store: ResultStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(RESULT_STORE_PATH, RESULT_INLINE_CHARS, RESULT_TTL_HOURS * 3600)
+    return _store
+
+
+def thread_of(config: Optional[RunnableConfig]) -> str:
+    """The conversation a run belongs to; results are stored and fetched per thread."""
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    return "" if thread_id is None else str(thread_id)
+
+
+@tool
+def fetch_tool_result(
+    handle: str,
+    offset: int = 0,
+    limit: int = 10,
+    columns: Optional[list[str]] = None,
+    *,
+    config: RunnableConfig,
+) -> dict:
+    """
+    Read part of a large tool result that was stored under a handle instead of being shown in full.
+
+    Args:
+        handle (str): The handle given in place of the result, e.g. "res_1a2b3c4d5e6f".
+        offset (int): The first row (or line, for text results) to return. Defaults to 0.
+        limit (int): The number of rows or lines to return. Defaults to 10, at most 50.
+        columns (Optional[list[str]]): Only return these columns of a tabular result. Defaults to all.
+
+    Returns:
+        dict: The requested rows under a "columns" header with the "total" number of stored rows,
+        or the requested "lines" with "total_lines" for text results.
+    """
+    return get_result_store().fetch(handle, offset, limit, columns, thread_of(config))
@@ -1,56 +1,408 @@
-import re
+import asyncio
+import threading
+import weakref
+from typing import Callable
+
+import httpx
 import numpy as np
 import openai
-from langchain_core.tools import tool
-import requests
+from langchain_core.tools import StructuredTool
 from dotenv import load_dotenv
 import streamlit as st
 
+from app.travel_agent.config import POLICY_CACHE_PATH, POLICY_INDEX, POLICY_QUANTIZE, POLICY_RETRIEVAL
+from .embedding_cache import EmbeddingCache
+from .faq_index import build_faq_index, content_hash, embedding_model, faq_index_dir, load_faq_index
+from .lexical import BM25Index
+from .vector_store import DocumentStore, StoreSnapshot
+
 
 load_dotenv()
 
-response = requests.get(
-    "https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md"
-)
-response.raise_for_status()
-faq_text = response.text
 
-docs = [{"page_content": txt} for txt in re.split(r"(?=\n##)", faq_text)]
+retrieval_modes = ("dense", "hybrid", "lexical")
 
 
 class VectorStoreRetriever:
-    def __init__(self, docs: list, vectors: list, oai_client):
-        self._arr = np.array(vectors)
-        self._docs = docs
+    """Ranks the FAQ sections for a question.
+
+    ``mode`` picks the scoring: "dense" embeds every query, "lexical" only uses the local BM25
+    index and never calls the network, and "hybrid" answers from BM25 when its best match is clear
+    (confidence of at least ``escalate_below``) and otherwise blends BM25 with the dense scores,
+    both scaled to [0, 1].
+    Dense candidates come from the ``index`` backend ("exact" or the approximate "ivf"), which is
+    persisted under ``index_path`` when one is given. ``quantize`` ("float16" or "int8") keeps
+    only a quantized copy of the vectors in memory and re-ranks a few candidates against the
+    float32 rows, which stay memory-mapped on disk.
+    """
+
+    def __init__(
+        self,
+        docs: list,
+        vectors,
+        oai_client,
+        cache: EmbeddingCache | None = None,
+        corpus: str | None = None,
+        mode: str = "dense",
+        hybrid_weight: float = 0.5,
+        escalate_below: float = 0.5,
+        index: str = "exact",
+        index_path: str | None = None,
+        index_options: dict | None = None,
+        quantize: str = "float32",
+        hybrid_candidates: int = 50,
+        ids: list[str] | None = None,
+        async_client_factory: Callable[[], openai.AsyncClient] | None = None,
+    ):
+        if mode not in retrieval_modes:
+            raise ValueError(f"Unknown retrieval mode {mode!r}, expected one of {retrieval_modes}")
+        # Rows are stored unit-length in float32, so ranking a batch of queries is one float32
+        # matrix product; an artifact that is already in that form (as OpenAI embeddings are)
+        # stays memory-mapped instead of being copied.
+        self._store = DocumentStore(
+            docs,
+            _unit_rows(vectors),
+            ids or [doc.get("id", str(row)) for row, doc in enumerate(docs)],
+            index,
+            index_path,
+            # Cached results are only valid for the corpus they were ranked against.
+            corpus,
+            quantize=quantize,
+            **(index_options or {}),
+        )
         self._client = oai_client
+        self._async_client_factory = async_client_factory
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._cache = cache
+        self._mode = mode
+        self._hybrid_weight = hybrid_weight
+        self._escalate_below = escalate_below
+        # (store version, BM25 index over the docs of that version)
+        self._lexical: tuple[int, BM25Index] | None = None
+        self._hybrid_candidates = hybrid_candidates
 
     @classmethod
-    def from_docs(cls, docs, oai_client):
+    def from_docs(cls, docs, oai_client, cache: EmbeddingCache | None = None, **options):
         embeddings = oai_client.embeddings.create(
-            model="text-embedding-3-small", input=[doc["page_content"] for doc in docs]
+            model=embedding_model, input=[doc["page_content"] for doc in docs]
         )
         vectors = [emb.embedding for emb in embeddings.data]
-        return cls(docs, vectors, oai_client)
+        return cls(docs, vectors, oai_client, cache, **options)
 
-    def query(self, query: str, k: int = 5) -> list[dict]:
-        embed = self._client.embeddings.create(
-            model="text-embedding-3-small", input=[query]
+    @classmethod
+    def from_index(cls, oai_client, path: str | None = None, cache: EmbeddingCache | None = None, **options):
+        """Load the prebuilt FAQ index artifact, building it first if there is none yet."""
+        kwargs = {"path": path} if path else {}
+        loaded = load_faq_index(**kwargs) or build_faq_index(oai_client, **kwargs)
+        manifest, vectors = loaded
+        options.setdefault("index_path", path or faq_index_dir)
+        return cls(manifest["docs"], vectors, oai_client, cache, manifest["corpus_hash"], **options)
+
+    def _cached_embeddings(self, queries: list[str]) -> tuple[list[np.ndarray | None], list[int]]:
+        embeddings: list[np.ndarray | None] = [None] * len(queries)
+        if self._cache is not None:
+            embeddings = [self._cache.get_embedding(embedding_model, query) for query in queries]
+        return embeddings, [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    def _fill_embeddings(self, queries, embeddings, missing, embed) -> np.ndarray:
+        # With every embedding cached (e.g. only the results missed, after a corpus change) there
+        # was no request.
+        for i, emb in zip(missing, embed.data if embed is not None else []):
+            embedding = np.asarray(emb.embedding, dtype=np.float32)
+            if self._cache is not None:
+                self._cache.put_embedding(embedding_model, queries[i], embedding)
+            embeddings[i] = embedding
+        return _unit_rows(np.stack(embeddings))
+
+    def embed_many(self, queries: list[str]) -> np.ndarray:
+        """Unit-length float32 embeddings of ``queries``; uncached ones share a single API request."""
+        embeddings, missing = self._cached_embeddings(queries)
+        embed = None
+        if missing:
+            embed = self._client.embeddings.create(
+                model=embedding_model, input=[queries[i] for i in missing]
+            )
+        return self._fill_embeddings(queries, embeddings, missing, embed)
+
+    async def aembed_many(self, queries: list[str]) -> np.ndarray:
+        """``embed_many`` over this event loop's shared async client."""
+        embeddings, missing = self._cached_embeddings(queries)
+        embed = None
+        if missing:
+            embed = await (await self._async_client()).embeddings.create(
+                model=embedding_model, input=[queries[i] for i in missing]
+            )
+        return self._fill_embeddings(queries, embeddings, missing, embed)
+
+    async def _async_client(self):
+        # httpx pools are bound to the event loop that opened them, so each loop gets its own
+        # client, shared by every coroutine running on it.
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            # Loops closed without shutting down their async generators never closed their client.
+            for closed in [other for other in list(self._async_clients) if other.is_closed()]:
+                self._async_clients.pop(closed, None)
+            lifetime = self._client_lifetime(loop)
+            # Runs the factory up to the first yield without suspending, so no other coroutine
+            # can create a second client for this loop meanwhile.
+            entry = self._async_clients[loop] = (await lifetime.__anext__(), lifetime)
+        return entry[0]
+
+    async def _client_lifetime(self, loop):
+        """Holds a loop's client open. As an async generator it is closed by the loop's
+        ``shutdown_asyncgens`` (which ``asyncio.run`` calls), closing the client with it."""
+        client = self._async_client_factory()
+        try:
+            yield client
+        finally:
+            self._async_clients.pop(loop, None)
+            await client.close()
+
+    def embed(self, query: str) -> np.ndarray:
+        return self.embed_many([query])[0]
+
+    def _embed_docs(self, docs: list[dict]) -> np.ndarray:
+        embeddings = self._client.embeddings.create(
+            model=embedding_model, input=[doc["page_content"] for doc in docs]
         )
-        # "@" is just a matrix multiplication in python
-        scores = np.array(embed.data[0].embedding) @ self._arr.T
+        return _unit_rows([emb.embedding for emb in embeddings.data])
+
+    @staticmethod
+    def _doc_ids(docs: list[dict], ids: list[str] | None) -> list[str]:
+        if ids is None:
+            if not all("id" in doc for doc in docs):
+                raise ValueError("Pass ids or give every doc an 'id'")
+            ids = [doc["id"] for doc in docs]
+        if len(ids) != len(docs):
+            raise ValueError("Expected one id per doc")
+        return ids
+
+    def add_docs(self, docs: list[dict], ids: list[str] | None = None) -> list[str]:
+        """Embed ``docs`` in one request and add them under ``ids`` (default: each doc's "id")."""
+        ids = self._doc_ids(docs, ids)
+        taken = [doc_id for doc_id in ids if doc_id in self._store]
+        if taken:
+            raise ValueError(f"Docs already exist: {taken}; use upsert_docs to replace them")
+        if docs:
+            self._store.append(ids, docs, self._embed_docs(docs))
+        return ids
+
+    def remove_docs(self, ids: list[str]) -> int:
+        """Remove the docs with ``ids``; returns how many of them existed."""
+        return self._store.remove(ids)
+
+    def upsert_docs(self, docs: list[dict], ids: list[str] | None = None) -> list[str]:
+        """Add or replace docs by id, embedding only those that are new or whose text changed.
+
+        Returns the ids that were (re-)embedded.
+        """
+        ids = self._doc_ids(docs, ids)
+        changed = [
+            i for i, (doc_id, doc) in enumerate(zip(ids, docs))
+            if self._store.content_hash(doc_id) != content_hash(doc["page_content"])
+        ]
+        if changed:
+            self._store.append(
+                [ids[i] for i in changed], [docs[i] for i in changed], self._embed_docs([docs[i] for i in changed])
+            )
+        return [ids[i] for i in changed]
+
+    def compact(self):
+        self._store.compact()
+
+    def _lexical_index(self, snapshot: StoreSnapshot) -> BM25Index:
+        lexical = self._lexical
+        if lexical is None or lexical[0] != snapshot.version:
+            # Removed rows index as empty text, so they never score.
+            lexical = (snapshot.version, BM25Index([doc or {"page_content": ""} for doc in snapshot.docs]))
+            self._lexical = lexical
+        return lexical[1]
+
+    def _ranked(self, scores: np.ndarray, k: int) -> list[tuple[int, float]]:
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
         top_k_idx = np.argpartition(scores, -k)[-k:]
         top_k_idx_sorted = top_k_idx[np.argsort(-scores[top_k_idx])]
+        # Removed rows score -inf and are left out.
+        return [(int(idx), scores[idx]) for idx in top_k_idx_sorted if scores[idx] > -np.inf]
+
+    def _rank_without_embeddings(self, queries: list[str], k: int):
+        """Rank what BM25 or the results cache can answer; the rest is left for dense scoring."""
+        ranked: list[list[tuple[int, float]] | None] = [None] * len(queries)
+        lexical: list[np.ndarray | None] = [None] * len(queries)
+        # Every step ranks against the same snapshot, so a concurrent change to the store cannot
+        # shift the rows between them.
+        snapshot = self._store.snapshot()
+        if not snapshot.alive.any():
+            # Nothing to rank (an empty store, or every doc removed): no embeddings needed either.
+            return [[] for _ in queries], lexical, [], snapshot
+        if self._mode != "dense":
+            lexical_index = self._lexical_index(snapshot)
+            for i, query in enumerate(queries):
+                scores = lexical_index.scores(query)
+                if scores.max() > 0:
+                    scores /= scores.max()
+                confidence = BM25Index.confidence(scores)
+                scores[~snapshot.alive] = -np.inf
+                if self._mode == "lexical" or confidence >= self._escalate_below:
+                    # Sections sharing no term with the query are not matches, so fewer than k
+                    # can come back.
+                    ranked[i] = [(idx, score) for idx, score in self._ranked(scores, k) if score > 0]
+                lexical[i] = scores
+
+        dense = [i for i, result in enumerate(ranked) if result is None]
+        if self._cache is not None:
+            for i in dense:
+                ranked[i] = self._cache.get_results(self._cache_model(), snapshot.corpus, queries[i], k)
+            dense = [i for i in dense if ranked[i] is None]
+        return ranked, lexical, dense, snapshot
+
+    def cache_stats(self) -> dict:
+        """Hit-rate counters of the query cache; empty without one."""
+        return self._cache.stats() if self._cache is not None else {}
+
+    def _cache_model(self) -> str:
+        # Hybrid results depend on the BM25 scores and on how the two are scaled, so they get their
+        # own cache entries.
+        return embedding_model if self._mode == "dense" else f"{embedding_model}+bm25-minmax"
+
+    def _rank_dense(self, queries, k, ranked, lexical, dense, snapshot, embeddings) -> list[list[dict]]:
+        if dense:
+            n_candidates = k if self._mode == "dense" else max(k, self._hybrid_candidates)
+            ids, scores = snapshot.search(embeddings, n_candidates)
+            for row, i in enumerate(dense):
+                found = ids[row] >= 0
+                if lexical[i] is None:
+                    ranked[i] = [(int(idx), score) for idx, score in zip(ids[row][found], scores[row][found])]
+                else:
+                    # Blend over the dense candidates plus the best lexical matches, which the
+                    # dense search may have missed.
+                    lexical_best = [idx for idx, _ in self._ranked(lexical[i], k)]
+                    candidates = np.union1d(ids[row][found], lexical_best)
+                    # "@" is just a matrix multiplication in python
+                    blended = (
+                        self._hybrid_weight * _min_max(snapshot.vectors[candidates] @ embeddings[row])
+                        + (1 - self._hybrid_weight) * lexical[i][candidates]
+                    )
+                    ranked[i] = [(int(candidates[j]), score) for j, score in self._ranked(blended, k)]
+                if self._cache is not None:
+                    self._cache.put_results(self._cache_model(), snapshot.corpus, queries[i], k, ranked[i])
+
         return [
-            {**self._docs[idx], "similarity": scores[idx]} for idx in top_k_idx_sorted
+            [{**snapshot.docs[idx], "similarity": score} for idx, score in result] for result in ranked
         ]
 
+    def query_many(self, queries: list[str], k: int = 5) -> list[list[dict]]:
+        """Top-``k`` sections for each of ``queries``, in order.
+
+        All queries that need dense scores are embedded in one request and scored with one
+        matrix product.
+        """
+        if k <= 0:
+            return [[] for _ in queries]
+        ranked, lexical, dense, snapshot = self._rank_without_embeddings(queries, k)
+        embeddings = self.embed_many([queries[i] for i in dense]) if dense else None
+        return self._rank_dense(queries, k, ranked, lexical, dense, snapshot, embeddings)
+
+    def query(self, query: str, k: int = 5) -> list[dict]:
+        return self.query_many([query], k)[0]
+
+    async def aquery_many(self, queries: list[str], k: int = 5) -> list[list[dict]]:
+        """``query_many`` that awaits the embeddings request instead of blocking the thread.
+
+        Without an async client factory the sync query runs in a worker thread.
+        """
+        if self._async_client_factory is None:
+            return await asyncio.to_thread(self.query_many, queries, k)
+        if k <= 0:
+            return [[] for _ in queries]
+        ranked, lexical, dense, snapshot = self._rank_without_embeddings(queries, k)
+        embeddings = await self.aembed_many([queries[i] for i in dense]) if dense else None
+        return self._rank_dense(queries, k, ranked, lexical, dense, snapshot, embeddings)
+
+    async def aquery(self, query: str, k: int = 5) -> list[dict]:
+        return (await self.aquery_many([query], k))[0]
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    """``scores`` scaled to [0, 1], like the max-normalized BM25 scores they are blended with."""
+    if scores.size == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    return (scores - low) / (high - low) if high > low else np.ones_like(scores)
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    # asanyarray: a memory-mapped artifact that is already unit float32 comes back as the same memmap.
+    vectors = np.asanyarray(vectors)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    if vectors.dtype == np.float32 and np.allclose(norms, 1.0, atol=1e-4):
+        return vectors
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
 
-retriever = VectorStoreRetriever.from_docs(docs, openai.Client(api_key=st.secrets["openai"]))
+def _async_openai_client() -> openai.AsyncClient:
+    # One keep-alive pool for all policy lookups running on an event loop.
+    return openai.AsyncClient(
+        api_key=st.secrets["openai"],
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+        ),
+    )
 
 
-@tool
-def lookup_policy(query: str) -> str:
+_retriever: VectorStoreRetriever | None = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> VectorStoreRetriever:
+    """The shared FAQ retriever, loaded from the index artifact on first use."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = VectorStoreRetriever.from_index(
+                    openai.Client(api_key=st.secrets["openai"]),
+                    async_client_factory=_async_openai_client,
+                    cache=EmbeddingCache(path=POLICY_CACHE_PATH),
+                    mode=POLICY_RETRIEVAL,
+                    index=POLICY_INDEX,
+                    quantize=POLICY_QUANTIZE,
+                )
+    return _retriever
+
+
+def _policy_sections(results: list[list[dict]]) -> str:
+    # Questions often share sections; each is returned once, in order of first match.
+    sections = dict.fromkeys(doc["page_content"] for docs in results for doc in docs)
+    return "\n\n".join(sections)
+
+
+def _lookup_policy(query: str | list[str]) -> str:
     """Consult the company policies to check whether certain options are permitted.
-    Use this before making any flight changes performing other 'write' events."""
-    docs = retriever.query(query, k=2)
-    return "\n\n".join([doc["page_content"] for doc in docs])
\ No newline at end of file
+    Use this before making any flight changes performing other 'write' events.
+    Pass several questions as a list to look them all up in one call."""
+    queries = [query] if isinstance(query, str) else query
+    return _policy_sections(get_retriever().query_many(queries, k=2))
+
+
+async def _alookup_policy(query: str | list[str]) -> str:
+    queries = [query] if isinstance(query, str) else query
+    # The first call loads (or builds) the index, which must not block the event loop.
+    retriever = _retriever or await asyncio.to_thread(get_retriever)
+    return _policy_sections(await retriever.aquery_many(queries, k=2))
+
+
+# The same tool for invoke and ainvoke/astream: the async path awaits the embeddings request.
+lookup_policy = StructuredTool.from_function(
+    func=_lookup_policy, coroutine=_alookup_policy, name="lookup_policy"
+)
+
+
+def policy_cache_stats() -> dict:
+    """Hit-rate counters of the shared retriever's query cache; empty until it is built."""
+    retriever = _retriever
+    return retriever.cache_stats() if retriever is not None else {}
@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import json
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional, Union
+
+from .connection import connection
+
+default_page_size = 10
+max_page_size = 50
+# Long text columns are cut to this many characters in search results.
+preview_chars = 120
+
+_word = re.compile(r"\w+", re.UNICODE)
+
+
+def _phrase(term: str) -> Optional[str]:
+    """Quote ``term`` as an FTS5 prefix phrase, e.g. ``old tow`` -> ``"old tow"*``."""
+    words = _word.findall(term)
+    if not words:
+        return None
+    return '"' + " ".join(words) + '"*'
+
+
+def match_expression(
+    all_of: Optional[dict[str, Optional[str]]] = None,
+    any_of: Optional[dict[str, Optional[list[str]]]] = None,
+) -> Optional[str]:
+    """Build an FTS5 MATCH expression from user supplied search terms.
+
+    ``all_of`` maps a column to a term that must match it; ``any_of`` maps a column to terms of
+    which at least one must match. User input only ever ends up inside quoted phrases, so FTS5
+    syntax characters in it are harmless. Returns None when there is nothing to match on.
+    """
+    clauses = []
+    for column, term in (all_of or {}).items():
+        phrase = _phrase(term) if term else None
+        if phrase:
+            clauses.append(f"{column} : {phrase}")
+    for column, terms in (any_of or {}).items():
+        phrases = [p for p in (_phrase(t) for t in terms or []) if p]
+        if phrases:
+            clauses.append(f"{column} : ({' OR '.join(phrases)})")
+    return " AND ".join(clauses) or None
+
+
+def _day(value: Union[datetime, date, str]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def availability_conditions(
+    start_column: str,
+    end_column: str,
+    start: Optional[Union[datetime, date, str]] = None,
+    end: Optional[Union[datetime, date, str]] = None,
+) -> tuple[list[str], list]:
+    """Conditions keeping rows whose ``[start_column, end_column]`` window overlaps ``[start, end]``.
+
+    Both bounds are whole days and either may be omitted. The columns are compared as ISO text,
+    which works for plain dates and full timestamps alike and lets SQLite use their indexes.
+    """
+    conditions, params = [], []
+    if start:
+        conditions.append(f"t.{end_column} >= ?")
+        params.append(_day(start).isoformat())
+    if end:
+        conditions.append(f"t.{start_column} < ?")
+        params.append((_day(end) + timedelta(days=1)).isoformat())
+    return conditions, params
+
+
+def text_search_query(
+    table: str,
+    match: Optional[str],
+    conditions: Optional[list[str]] = None,
+    params: Optional[list] = None,
+    columns: Optional[list[str]] = None,
+    previews: Optional[list[str]] = None,
+) -> tuple[str, list]:
+    """``SELECT`` over ``table`` restricted to ``match`` and extra ``conditions`` on alias ``t``.
+
+    Text searches go through ``<table>_fts`` and come back best match first; without a match
+    expression rows are returned in id order. ``columns`` defaults to every column; those also
+    listed in ``previews`` are cut to ``preview_chars`` characters.
+    """
+    where = list(conditions or [])
+    params = list(params or [])
+    previews = set(previews or [])
+    projection = ", ".join(
+        f"CASE WHEN length(t.{c}) > {preview_chars} THEN substr(t.{c}, 1, {preview_chars}) || '...' "
+        f"ELSE t.{c} END AS {c}"
+        if c in previews
+        else f"t.{c}"
+        for c in columns
+    ) if columns else "t.*"
+    if match is None:
+        query = f"SELECT {projection} FROM {table} t"
+        order = "t.id"
+    else:
+        query = (
+            f"SELECT {projection} FROM {table}_fts JOIN {table} t ON t.id = {table}_fts.rowid"
+        )
+        where.insert(0, f"{table}_fts MATCH ?")
+        params.insert(0, match)
+        order = f"{table}_fts.rank"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    return f"{query} ORDER BY {order}", params
+
+
+def _fingerprint(query: str, params: list) -> str:
+    return hashlib.sha256(json.dumps([query, params], default=str).encode("utf-8")).hexdigest()[:8]
+
+
+def _encode_cursor(offset: int, total: int, fingerprint: str) -> str:
+    payload = json.dumps([offset, total, fingerprint], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, fingerprint: str) -> tuple[int, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offset, total, issued_for = json.loads(payload)
+        offset, total = int(offset), int(total)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}; pass the next_cursor of a previous page.") from e
+    if issued_for != fingerprint:
+        raise ValueError(f"Cursor {cursor!r} belongs to a different search; repeat that search or start over.")
+    return max(0, offset), total
+
+
+def paginate(
+    query: str,
+    params: list,
+    page_size: int = default_page_size,
+    cursor: Optional[str] = None,
+) -> dict:
+    """Run one page of ``query`` and return it in a compact, prompt-friendly shape.
+
+    Rows are returned as lists under a shared ``columns`` header, together with the ``total``
+    number of matches and the ``next_cursor`` to pass back for the following page (None on the
+    last page). The cursor is opaque: it encodes the offset, the total counted for the first page
+    (later pages do not count again) and a fingerprint of the search it belongs to.
+    """
+    page_size = max(1, min(int(page_size or default_page_size), max_page_size))
+    fingerprint = _fingerprint(query, params)
+    offset, total = _decode_cursor(cursor, fingerprint) if cursor else (0, None)
+
+    conn = connection()
+    if total is None:
+        (total,) = conn.execute(f"SELECT count(*) FROM ({query})", params).fetchone()
+    page = conn.execute(f"{query} LIMIT ? OFFSET ?", [*params, page_size, offset])
+    rows = [list(row) for row in page.fetchall()]
+    next_offset = offset + len(rows)
+    return {
+        "columns": [column[0] for column in page.description],
+        "rows": rows,
+        "total": total,
+        "next_cursor": _encode_cursor(next_offset, total, fingerprint) if rows and next_offset < total else None,
+    }
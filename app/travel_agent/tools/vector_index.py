@@ -0,0 +1,312 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Vectors are scored in chunks of this many rows so a large corpus never needs a full score matrix.
+chunk_rows = 65536
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of the ``k`` best scores of every row, best first."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=scores.dtype)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-best, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(best, order, axis=1)
+
+
+class QuantizedVectors:
+    """Scalar-quantized copy of unit-length float32 rows: "float16" halves the memory, "int8"
+    (symmetric, one float32 scale per row) quarters it.
+
+    Indexing returns dequantized float32 rows, so the indexes treat it like the original matrix.
+    The rows are read a chunk at a time, so a memory-mapped ``vectors`` is never loaded whole.
+    """
+
+    def __init__(self, vectors: np.ndarray, dtype: str):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unknown quantization {dtype!r}, expected float16 or int8")
+        self.dtype = dtype
+        self._data = np.empty(vectors.shape, dtype=dtype)
+        self._scale = np.empty(len(vectors), dtype=np.float32) if dtype == "int8" else None
+        for i in range(0, len(vectors), chunk_rows):
+            chunk = np.asarray(vectors[i:i + chunk_rows], dtype=np.float32)
+            if self._scale is None:
+                self._data[i:i + chunk_rows] = chunk
+                continue
+            scale = np.maximum(np.abs(chunk).max(axis=1) / 127, 1e-12)
+            self._scale[i:i + chunk_rows] = scale
+            self._data[i:i + chunk_rows] = np.rint(chunk / scale[:, None])
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes + (self._scale.nbytes if self._scale is not None else 0)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        data = self._data[rows].astype(np.float32)
+        if self._scale is not None:
+            data *= self._scale[rows][..., None]
+        return data
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """``queries @ rows.T``, dequantizing one chunk of rows at a time."""
+        out = np.empty((len(queries), len(self)), dtype=np.float32)
+        for i in range(0, len(self), chunk_rows):
+            out[:, i:i + chunk_rows] = queries @ self[i:i + chunk_rows].T
+        return out
+
+
+def _scores(vectors, queries: np.ndarray) -> np.ndarray:
+    if isinstance(vectors, QuantizedVectors):
+        return vectors.scores(queries)
+    return queries @ vectors.T
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    """Mean share of the expected top-k ids per query that ``found`` also returned."""
+    hits = [len(np.intersect1d(f[f >= 0], e[e >= 0])) / max(1, (e >= 0).sum()) for f, e in zip(found, expected)]
+    return float(np.mean(hits)) if hits else 1.0
+
+
+def _perturbed(rows: np.ndarray, similarity: float, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors at cosine ``similarity`` to ``rows``, in random directions.
+
+    Tuning on the rows themselves overstates recall: a row always lies in the list of its own
+    nearest centroid, so one probe finds it. Real queries only resemble the rows they match.
+    """
+    noise = rng.standard_normal(rows.shape).astype(np.float32)
+    noise -= np.sum(noise * rows, axis=1, keepdims=True) * rows
+    noise /= np.maximum(np.linalg.norm(noise, axis=1, keepdims=True), 1e-12)
+    return similarity * rows + np.sqrt(1 - similarity**2) * noise
+
+
+class ExactIndex:
+    """Brute-force inner-product search over unit-length float32 rows."""
+
+    kind = "exact"
+
+    def __init__(self, vectors: np.ndarray):
+        self._vectors = vectors
+
+    def __len__(self):
+        return len(self._vectors)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray) -> "ExactIndex":
+        return cls(vectors)
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Ids and scores of the ``k`` nearest rows for each query, best first."""
+        return _top_k(_scores(self._vectors, queries), k)
+
+    def save(self, path: str, corpus: str):
+        # Nothing beyond the vectors themselves, which the FAQ index artifact already stores.
+        pass
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, corpus: str) -> Optional["ExactIndex"]:
+        return cls(vectors)
+
+
+class IVFIndex:
+    """Inverted-file index: rows are grouped around k-means centroids and only the ``n_probe``
+    lists whose centroids are closest to a query are scanned.
+
+    With about ``sqrt(n)`` lists a query scores ``n_lists + n_probe * n / n_lists`` rows, so its
+    cost grows with the square root of the corpus; raising ``n_probe`` trades speed for recall.
+    Unless ``n_probe`` is given, ``build`` tunes it on perturbed copies of a sample of the rows,
+    and it is persisted with the index.
+    """
+
+    kind = "ivf"
+    file_name = "index_ivf.npz"
+    # Bumped when saved indexes must be rebuilt; version 2 tunes n_probe at build time, version 3
+    # tunes it on perturbed rows.
+    format_version = 3
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, n_probe: int):
+        self._vectors = vectors
+        self._centroids = centroids
+        self._order = order
+        self._offsets = offsets
+        self.n_probe = n_probe
+
+    def __len__(self):
+        return len(self._vectors)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self._centroids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: Optional[int] = None,
+        iterations: int = 10,
+        train_per_list: int = 64,
+        seed: int = 0,
+        target_recall: float = 0.95,
+        tune_queries: int = 256,
+        tune_k: int = 10,
+        tune_similarity: float = 0.7,
+    ) -> "IVFIndex":
+        n = len(vectors)
+        if n == 0:
+            dims = vectors[:0].shape[1]
+            empty = np.empty(0, dtype=np.int64)
+            return cls(vectors, np.empty((0, dims), dtype=np.float32), empty, np.zeros(1, dtype=np.int64), 1)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        train = np.asarray(vectors[np.sort(rng.choice(n, min(n, n_lists * train_per_list), replace=False))], dtype=np.float32)
+        centroids = train[rng.choice(len(train), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            counts = np.bincount(assign, minlength=n_lists)
+            order = np.argsort(assign, kind="stable")
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)])[filled]
+            sums = np.add.reduceat(train[order], starts, axis=0)
+            centroids[filled] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                centroids[empty] = train[rng.choice(len(train), len(empty), replace=False)]
+
+        assign = np.concatenate(
+            [np.argmax(vectors[i:i + chunk_rows] @ centroids.T, axis=1) for i in range(0, n, chunk_rows)]
+        )
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+        index = cls(vectors, centroids, order, offsets, n_probe or n_lists)
+        if not n_probe:
+            sample = np.sort(rng.choice(n, min(n, tune_queries), replace=False))
+            queries = _perturbed(np.asarray(vectors[sample], dtype=np.float32), tune_similarity, rng)
+            index.tune(queries, min(tune_k, n), target_recall)
+        return index
+
+    def search(self, queries: np.ndarray, k: int, n_probe: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        """Approximate ids and scores of the ``k`` nearest rows for each query, best first.
+
+        Rows the probed lists do not cover are returned as id -1 with score -inf.
+        """
+        probe = min(n_probe or self.n_probe, self.n_lists)
+        lists, _ = _top_k(queries @ self._centroids.T, probe)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if not self.n_lists:
+            return ids, scores
+        for row, (query, probed) in enumerate(zip(queries, lists)):
+            candidates = np.concatenate([self._order[self._offsets[l]:self._offsets[l + 1]] for l in probed])
+            if not len(candidates):
+                continue
+            best, best_scores = _top_k((self._vectors[candidates] @ query)[None, :], k)
+            ids[row, :best.shape[1]] = candidates[best[0]]
+            scores[row, :best.shape[1]] = best_scores[0]
+        return ids, scores
+
+    def tune(self, queries: np.ndarray, k: int, target_recall: float = 0.95) -> dict:
+        """Set ``n_probe`` to the smallest power of two whose recall@k on ``queries`` meets the target."""
+        expected, _ = ExactIndex(self._vectors).search(queries, k)
+        probe = 1
+        while True:
+            recall = recall_at_k(self.search(queries, k, probe)[0], expected)
+            if recall >= target_recall or probe >= self.n_lists:
+                break
+            probe = min(probe * 2, self.n_lists)
+        self.n_probe = probe
+        return {"n_probe": probe, "n_lists": self.n_lists, "recall": recall}
+
+    def save(self, path: str, corpus: str):
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, self.file_name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, centroids=self._centroids, order=self._order, offsets=self._offsets,
+                n_probe=self.n_probe, corpus=corpus, format_version=self.format_version,
+            )
+        os.replace(tmp, os.path.join(path, self.file_name))
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, corpus: str) -> Optional["IVFIndex"]:
+        """The persisted index for ``corpus``, or None if there is none or it was built for another."""
+        try:
+            data = np.load(os.path.join(path, cls.file_name))
+        except OSError:
+            return None
+        if "format_version" not in data or int(data["format_version"]) != cls.format_version:
+            return None
+        if str(data["corpus"]) != corpus or len(data["order"]) != len(vectors):
+            return None
+        return cls(vectors, data["centroids"], data["order"], data["offsets"], int(data["n_probe"]))
+
+
+class RerankedIndex:
+    """Searches ``index`` (built over quantized rows) for ``rerank`` times the requested
+    candidates and re-scores those against the exact float32 rows."""
+
+    def __init__(self, index, vectors: np.ndarray, rerank: int = 4):
+        self._index = index
+        self._vectors = vectors
+        self.rerank = rerank
+        self.kind = index.kind
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        candidates, _ = self._index.search(queries, k * self.rerank)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for row, (query, found) in enumerate(zip(queries, candidates)):
+            found = found[found >= 0]
+            if not len(found):
+                continue
+            # Sorted ids keep the reads from a memory-mapped matrix sequential.
+            found = np.sort(found)
+            best, best_scores = _top_k((self._vectors[found] @ query)[None, :], k)
+            ids[row, :best.shape[1]] = found[best[0]]
+            scores[row, :best.shape[1]] = best_scores[0]
+        return ids, scores
+
+
+index_backends = {backend.kind: backend for backend in (ExactIndex, IVFIndex)}
+quantizations = ("float32", "float16", "int8")
+
+
+def open_index(
+    kind: str,
+    vectors: np.ndarray,
+    path: Optional[str] = None,
+    corpus: str = "",
+    quantize: str = "float32",
+    rerank: int = 4,
+    **options,
+):
+    """Load the ``kind`` index persisted under ``path`` for ``corpus``, or build (and persist) it.
+
+    With ``quantize`` set to "float16" or "int8" the index scans a quantized copy of ``vectors``
+    and only the best ``rerank * k`` candidates are read from the float32 rows, so a memory-mapped
+    ``vectors`` is mostly left on disk.
+    """
+    if kind not in index_backends:
+        raise ValueError(f"Unknown index backend {kind!r}, expected one of {tuple(index_backends)}")
+    if quantize not in quantizations:
+        raise ValueError(f"Unknown quantization {quantize!r}, expected one of {quantizations}")
+    stored = vectors if quantize == "float32" else QuantizedVectors(vectors, quantize)
+    backend = index_backends[kind]
+    index = backend.load(path, stored, corpus) if path else None
+    if index is None:
+        index = backend.build(stored, **options)
+        if path:
+            index.save(path, corpus)
+    return index if stored is vectors else RerankedIndex(index, vectors, rerank)
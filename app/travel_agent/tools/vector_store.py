@@ -0,0 +1,233 @@
+import tempfile
+import threading
+from typing import Optional
+
+import numpy as np
+
+from .faq_index import content_hash
+from .vector_index import _top_k, chunk_rows, open_index
+
+
+def _on_disk(rows: int, dims: int, directory: Optional[str] = None) -> np.memmap:
+    """A writable float32 matrix backed by an unnamed temporary file, removed once unmapped."""
+    with tempfile.TemporaryFile(dir=directory) as f:
+        return np.memmap(f, dtype=np.float32, mode="w+", shape=(max(rows, 1), dims))
+
+
+def _copy_rows(target: np.ndarray, source: np.ndarray, rows: np.ndarray | int):
+    """``target[:n] = source[rows]`` (or ``source[:rows]``), a chunk at a time."""
+    count = rows if isinstance(rows, int) else len(rows)
+    for i in range(0, count, chunk_rows):
+        end = min(i + chunk_rows, count)
+        target[i:end] = source[i:end] if isinstance(rows, int) else source[rows[i:end]]
+
+
+class StoreSnapshot:
+    """The rows of a ``DocumentStore`` at one point in time.
+
+    The store never changes the lists and arrays it hands out, so later appends, removals and
+    compactions leave a snapshot as it was: the rows its ``search`` returns index its own
+    ``docs``, ``alive`` and ``vectors``, and ``corpus`` identifies that layout.
+    """
+
+    def __init__(self, docs, alive, vectors, index, indexed: int, dead: int, corpus: str, version: int):
+        self.docs: list[dict | None] = docs
+        self.alive: np.ndarray = alive
+        self.vectors: np.ndarray = vectors
+        self.corpus = corpus
+        self.version = version
+        self._index = index
+        self._indexed = indexed
+        self._dead = dead
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the ``k`` best live rows per query, best first; -1 pads missing ones."""
+        ids = np.empty((len(queries), 0), dtype=np.int64)
+        scores = np.empty((len(queries), 0), dtype=np.float32)
+        if self._indexed:
+            # Ask for enough extra candidates that tombstoned hits cannot crowd out live rows.
+            ids, scores = self._index.search(queries, min(k + self._dead, self._indexed))
+        if self._indexed < len(self.vectors):
+            tail_scores = queries @ self.vectors[self._indexed:].T
+            tail_ids = np.broadcast_to(np.arange(self._indexed, len(self.vectors)), tail_scores.shape)
+            ids = np.concatenate([ids, tail_ids], axis=1)
+            scores = np.concatenate([scores, tail_scores], axis=1)
+        scores = np.where((ids >= 0) & self.alive[np.maximum(ids, 0)], scores, -np.inf)
+        if not ids.shape[1]:
+            return np.full((len(queries), k), -1, dtype=np.int64), np.full((len(queries), k), -np.inf)
+        best, best_scores = _top_k(scores, k)
+        rows = np.take_along_axis(ids, best, axis=1)
+        return np.where(np.isfinite(best_scores), rows, -1), best_scores
+
+
+class DocumentStore:
+    """Row-aligned docs and unit-length float32 vectors, addressed by stable doc ids.
+
+    New rows are appended to a growable buffer and searched exhaustively until the next
+    compaction; removed rows become tombstones that searches skip. Compaction drops the
+    tombstones and rebuilds the index over every row once the appended tail or the tombstones
+    exceed ``compact_fraction`` of the store. Row numbers are only stable between compactions;
+    rank against a ``snapshot()`` to use them across several steps while the store may change.
+
+    With a ``quantize``d index the float32 rows are only read to re-rank candidates, so they are
+    kept out of core: a memory-mapped artifact is used as is, anything else is written to a
+    temporary file under ``spill_dir``, and appends and compactions grow such files too.
+    """
+
+    def __init__(
+        self,
+        docs: list[dict],
+        vectors: np.ndarray,
+        ids: list[str],
+        index: str = "exact",
+        index_path: Optional[str] = None,
+        corpus: Optional[str] = None,
+        compact_fraction: float = 0.2,
+        spill_dir: Optional[str] = None,
+        **index_options,
+    ):
+        if len(set(ids)) != len(ids):
+            raise ValueError("Doc ids must be unique")
+        self._lock = threading.RLock()
+        self._spill_dir = spill_dir
+        self._out_of_core = index_options.get("quantize", "float32") != "float32"
+        if self._out_of_core and not isinstance(vectors, np.memmap):
+            spilled = _on_disk(len(vectors), vectors.shape[1], spill_dir)
+            _copy_rows(spilled, vectors, len(vectors))
+            vectors = spilled[:len(vectors)]
+        self._vectors = vectors
+        self._size = len(vectors)
+        self._docs: list[dict | None] = list(docs)
+        self._ids: list[str | None] = list(ids)
+        self._hashes = [content_hash(doc["page_content"]) for doc in docs]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._alive = np.ones(self._size, dtype=bool)
+        self._dead = 0
+        self._kind = index
+        self._index_options = index_options
+        self.compact_fraction = compact_fraction
+        self._corpus = corpus or self._layout_hash()
+        self._index = open_index(index, vectors, index_path, self._corpus, **index_options)
+        self._indexed = self._size
+        # Bumped on every change, so callers can rebuild what they derive from the rows.
+        self.version = 0
+
+    def __len__(self):
+        return self._size - self._dead
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._row_of
+
+    @property
+    def corpus(self) -> str:
+        """Identifies the live docs and their row layout, e.g. for caching ranked rows."""
+        return self._corpus
+
+    @property
+    def docs(self) -> list[dict | None]:
+        """Docs by row; removed rows are None."""
+        return self._docs
+
+    @property
+    def alive(self) -> np.ndarray:
+        """Mask of the rows that were not removed."""
+        return self._alive
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    def content_hash(self, doc_id: str) -> Optional[str]:
+        row = self._row_of.get(doc_id)
+        return None if row is None else self._hashes[row]
+
+    def _buffer(self, rows: int, dims: int) -> np.ndarray:
+        if self._out_of_core:
+            return _on_disk(rows, dims, self._spill_dir)
+        return np.empty((rows, dims), dtype=np.float32)
+
+    def _layout_hash(self) -> str:
+        return content_hash("".join(f"{row}:{self._hashes[row]};" for row in np.flatnonzero(self._alive)))
+
+    def append(self, ids: list[str], docs: list[dict], vectors: np.ndarray):
+        """Add rows for new ``ids``; existing ones are replaced (their old row is tombstoned)."""
+        with self._lock:
+            self._tombstone([doc_id for doc_id in ids if doc_id in self._row_of])
+            needed = self._size + len(ids)
+            if not self._vectors.flags.writeable or needed > len(self._vectors):
+                # Grow geometrically so a stream of small appends copies each row O(1) times;
+                # the first append also copies a read-only memory-mapped artifact (into memory,
+                # or into a temporary file when out of core).
+                grown = self._buffer(max(needed, 2 * self._size, 16), vectors.shape[1])
+                _copy_rows(grown, self._vectors, self._size)
+                self._vectors = grown
+            self._vectors[self._size:needed] = vectors
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            for row, (doc_id, doc) in enumerate(zip(ids, docs), start=self._size):
+                self._row_of[doc_id] = row
+                self._ids.append(doc_id)
+                self._hashes.append(content_hash(doc["page_content"]))
+            # A new list rather than an in-place append, since snapshots share the old one.
+            self._docs = self._docs + list(docs)
+            self._size = needed
+            self._changed()
+
+    def remove(self, ids: list[str]) -> int:
+        """Tombstone the rows of ``ids`` and return how many existed."""
+        with self._lock:
+            removed = self._tombstone([doc_id for doc_id in ids if doc_id in self._row_of])
+            if removed:
+                self._changed()
+            return removed
+
+    def _tombstone(self, ids: list[str]) -> int:
+        if ids:
+            # Copy on write: snapshots keep the mask and docs they were taken with.
+            self._alive = self._alive.copy()
+            self._docs = list(self._docs)
+        for doc_id in ids:
+            row = self._row_of.pop(doc_id)
+            self._alive[row] = False
+            self._docs[row] = None
+            self._ids[row] = None
+        self._dead += len(ids)
+        return len(ids)
+
+    def _changed(self):
+        tail = self._size - self._indexed
+        if self._dead > self.compact_fraction * self._size or tail > self.compact_fraction * max(self._indexed, 16):
+            self.compact()
+        else:
+            self._corpus = self._layout_hash()
+            self.version += 1
+
+    def compact(self):
+        """Drop tombstoned rows and rebuild the index over all remaining rows."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive)
+            kept = self._buffer(len(keep), self._vectors.shape[1])
+            _copy_rows(kept, self._vectors, keep)
+            self._vectors = kept[:len(keep)]
+            self._docs = [self._docs[row] for row in keep]
+            self._ids = [self._ids[row] for row in keep]
+            self._hashes = [self._hashes[row] for row in keep]
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._size = len(keep)
+            self._alive = np.ones(self._size, dtype=bool)
+            self._dead = 0
+            self._corpus = self._layout_hash()
+            # The index persisted for the original artifact no longer matches, so rebuild in memory.
+            self._index = open_index(self._kind, self._vectors, None, self._corpus, **self._index_options)
+            self._indexed = self._size
+            self.version += 1
+
+    def snapshot(self) -> StoreSnapshot:
+        with self._lock:
+            return StoreSnapshot(
+                self._docs, self._alive, self._vectors[:self._size], self._index,
+                self._indexed, self._dead, self._corpus, self.version,
+            )
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the ``k`` best live rows per query, best first; -1 pads missing ones."""
+        return self.snapshot().search(queries, k)
@@ -7,6 +7,9 @@ from langchain_core.messages import ToolMessage
 from langchain_core.runnables import RunnableLambda
 from langgraph.prebuilt import ToolNode
 
+from app.travel_agent.context import ConversationWindow
+from app.travel_agent.tools.result_store import get_result_store, thread_of
+
 def _print_event(event: dict, _printed: set, max_length=1500):
     current_state = event.get("dialog_state")
     if current_state:
@@ -47,12 +50,20 @@ class State(TypedDict):
         ],
         update_dialog_stack,
     ]
+    # Rolling summary of the turns before ``summarized_until`` (a message id); see ConversationWindow
+    summary: str
+    summarized_until: str
 
 class Assistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, window: Optional[ConversationWindow] = None):
         self.runnable = runnable
+        self.window = window
 
     def __call__(self, state: State, config: RunnableConfig):
+        update = {}
+        if self.window is not None:
+            messages, update = self.window.fit(state)
+            state = {**state, "messages": messages}
         while True:
             result = self.runnable.invoke(state)
 
@@ -65,7 +76,7 @@ class Assistant:
                 state = {**state, "messages": messages}
             else:
                 break
-        return {"messages": result}
+        return {"messages": result, **update}
 
 
 def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
@@ -101,10 +112,16 @@ def handle_tool_error(state) -> dict:
         ]
     }
 
+def offload_large_results(output: dict, config: RunnableConfig) -> dict:
+    """Replace oversized tool results with a handle into the result store, scoped to the thread."""
+    store = get_result_store()
+    thread_id = thread_of(config)
+    return {**output, "messages": [store.offload(message, thread_id) for message in output["messages"]]}
+
 def create_tool_node_with_fallback(tools: list) -> dict:
     return ToolNode(tools).with_fallbacks(
         [RunnableLambda(handle_tool_error)], exception_key="error"
-    )
+    ) | RunnableLambda(offload_large_results)
 
 def pop_dialog_state(state: State) -> dict:
     """Pop the dialog stack and return to the main assistant.
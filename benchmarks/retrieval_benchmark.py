@@ -0,0 +1,300 @@
+"""Offline benchmark of the policy retriever.
+
+Runs without network access: embeddings come from a deterministic fake client or are replayed
+from a recording. Reports build time, p50/p99 query latency, resident memory and recall@k
+against brute force for synthetic corpora (or a local FAQ file), and can fail when a run
+regresses from a saved baseline::
+
+    python -m benchmarks.retrieval_benchmark --sizes 100 10000 1000000 --json run.json
+    python -m benchmarks.retrieval_benchmark --check run.json
+
+Run it from the repository root. It lives outside the app so the agent never imports it.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+from app.travel_agent.tools.faq_index import split_faq
+from app.travel_agent.tools.retriever import VectorStoreRetriever
+from app.travel_agent.tools.vector_index import ExactIndex, recall_at_k
+
+default_sizes = (100, 10_000, 1_000_000)
+default_configs = ("exact/float32", "exact/int8", "ivf/float32", "ivf/int8")
+vocabulary_size = 5000
+
+
+def _word(i: int) -> str:
+    return f"w{i:04d}"
+
+
+def _response(vectors) -> SimpleNamespace:
+    return SimpleNamespace(data=[SimpleNamespace(embedding=vector) for vector in vectors])
+
+
+class FakeEmbeddingClient:
+    """Stands in for ``openai.Client``: a text embeds as the normalized sum of fixed random
+    vectors of its words, so texts sharing words are close, and the same text always gets the
+    same vector."""
+
+    def __init__(self, dims: int = 256, seed: int = 0):
+        self.dims = dims
+        self._seed = seed
+        self._words: dict[str, np.ndarray] = {}
+        self.embeddings = SimpleNamespace(create=self._create)
+        self.requests = 0
+
+    def word_vector(self, word: str) -> np.ndarray:
+        vector = self._words.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(f"{self._seed}:{word}".encode()).digest()[:8], "little")
+            vector = self._words[word] = np.random.default_rng(seed).standard_normal(self.dims).astype(np.float32)
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        words = text.lower().split() or [""]
+        vector = np.sum([self.word_vector(word) for word in words], axis=0)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _create(self, model: str, input: list[str]) -> SimpleNamespace:
+        self.requests += 1
+        return _response([self.embed(text) for text in input])
+
+
+class RecordedEmbeddingClient:
+    """Replays embeddings recorded in an ``.npz`` file, keyed by model and text.
+
+    With a ``client`` (e.g. a real ``openai.Client``) texts missing from the recording are
+    embedded by it and added, and ``save()`` writes the grown recording back.
+    """
+
+    def __init__(self, path: str, client=None):
+        self.path = path
+        self._client = client
+        self._vectors: dict[str, np.ndarray] = {}
+        if os.path.exists(path):
+            data = np.load(path)
+            self._vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def _create(self, model: str, input: list[str]) -> SimpleNamespace:
+        keys = [self._key(model, text) for text in input]
+        missing = [i for i, key in enumerate(keys) if key not in self._vectors]
+        if missing:
+            if self._client is None:
+                raise KeyError(f"{len(missing)} texts are not in the recording {self.path}")
+            response = self._client.embeddings.create(model=model, input=[input[i] for i in missing])
+            for i, emb in zip(missing, response.data):
+                self._vectors[keys[i]] = np.asarray(emb.embedding, dtype=np.float32)
+        return _response([self._vectors[key] for key in keys])
+
+    def save(self):
+        keys = list(self._vectors)
+        with open(self.path + ".tmp", "wb") as f:
+            np.savez(f, keys=np.array(keys), vectors=np.stack([self._vectors[key] for key in keys]))
+        os.replace(self.path + ".tmp", self.path)
+
+
+def synthetic_corpus(
+    client: FakeEmbeddingClient, size: int, doc_words: int = 24, n_queries: int = 200, seed: int = 0
+) -> tuple[list[dict], np.ndarray, list[str]]:
+    """``size`` docs of topical random words, their embeddings, and queries built from words of
+    random docs plus noise.
+
+    Words are drawn from a few hundred overlapping topics so the vectors cluster the way real
+    sections do. Doc vectors are computed in batches rather than through the client, so large
+    corpora build quickly; they are identical to what the client would return.
+    """
+    rng = np.random.default_rng(seed)
+    n_topics = max(1, min(500, size // 20))
+    topics = rng.integers(0, vocabulary_size, size=(n_topics, 40))
+    table = np.stack([client.word_vector(_word(i)) for i in range(vocabulary_size)])
+
+    docs, vectors = [], np.empty((size, client.dims), dtype=np.float32)
+    batch = 8192
+    for start in range(0, size, batch):
+        count = min(batch, size - start)
+        doc_topics = rng.integers(0, n_topics, size=count)
+        topical = topics[doc_topics[:, None], rng.integers(0, topics.shape[1], size=(count, doc_words - 4))]
+        words = np.concatenate([topical, rng.integers(0, vocabulary_size, size=(count, 4))], axis=1)
+        summed = table[words].sum(axis=1)
+        vectors[start:start + count] = summed / np.linalg.norm(summed, axis=1, keepdims=True)
+        docs.extend(
+            {"id": str(start + row), "page_content": " ".join(_word(w) for w in doc_words_)}
+            for row, doc_words_ in enumerate(words.tolist())
+        )
+
+    queries = []
+    for row in rng.integers(0, size, size=n_queries):
+        words = docs[row]["page_content"].split()
+        picked = rng.choice(words, size=min(6, len(words)), replace=False).tolist()
+        queries.append(" ".join(picked + [_word(int(rng.integers(0, vocabulary_size)))]))
+    return docs, vectors, queries
+
+
+def _resident() -> Optional[tuple[int, int]]:
+    """Private (anonymous) and file-backed resident bytes of this process; None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["RssAnon"].split()[0]) * 1024, int(fields["RssFile"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def run_case(
+    name: str,
+    docs: list[dict],
+    vectors: np.ndarray,
+    queries: list[str],
+    client,
+    config: str,
+    k: int = 10,
+    index_options: Optional[dict] = None,
+) -> dict:
+    """Build a retriever for ``config`` ("<index>/<quantize>") and time ``queries`` one by one."""
+    index, quantize = config.split("/")
+    options = index_options if index != "exact" else None
+
+    def build() -> VectorStoreRetriever:
+        return VectorStoreRetriever(docs, vectors, client, index=index, quantize=quantize, index_options=options)
+
+    # Resident memory is what the retriever adds on top of the docs and vectors it was given, once
+    # built and queried: "rss_mb" is private memory, "rss_file_mb" the pages of memory-mapped
+    # files it touched (the float32 rows re-ranked out of core, for the quantized configs).
+    gc.collect()
+    baseline = _resident()
+    start = time.perf_counter()
+    retriever = build()
+    build_seconds = time.perf_counter() - start
+
+    # Recall is measured on the ranking alone; the embedding requests are made up front.
+    query_vectors = retriever.embed_many(queries)
+    exact = ExactIndex(np.asarray(vectors, dtype=np.float32))
+    # Small query batches keep the brute-force score matrix small for large corpora.
+    expected = np.concatenate([exact.search(query_vectors[i:i + 16], k)[0] for i in range(0, len(queries), 16)])
+    row_of = {doc["id"]: row for row, doc in enumerate(docs)}
+
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = retriever.query(query, k)
+        latencies.append(time.perf_counter() - start)
+        found.append([row_of[doc["id"]] for doc in results] + [-1] * (k - len(results)))
+    gc.collect()
+    resident = _resident()
+    rss_mb = rss_file_mb = None
+    if baseline is not None and resident is not None:
+        rss_mb = round((resident[0] - baseline[0]) / 2**20, 1)
+        rss_file_mb = round((resident[1] - baseline[1]) / 2**20, 1)
+
+    return {
+        "case": name,
+        "config": config,
+        "docs": len(docs),
+        "dims": int(vectors.shape[1]),
+        "build_s": round(build_seconds, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "rss_mb": rss_mb,
+        "rss_file_mb": rss_file_mb,
+        "k": k,
+        "recall_at_k": round(recall_at_k(np.array(found), expected), 4),
+    }
+
+
+def check(results: list[dict], baseline: list[dict], latency_tolerance: float, recall_tolerance: float) -> list[str]:
+    """Regressions of ``results`` against ``baseline``, matched by case and config."""
+    previous = {(row["case"], row["config"]): row for row in baseline}
+    problems = []
+    for row in results:
+        before = previous.get((row["case"], row["config"]))
+        if before is None:
+            continue
+        label = f"{row['case']} {row['config']}"
+        if row["p99_ms"] > before["p99_ms"] * latency_tolerance:
+            problems.append(f"{label}: p99 {row['p99_ms']} ms vs {before['p99_ms']} ms")
+        if row["recall_at_k"] < before["recall_at_k"] - recall_tolerance:
+            problems.append(f"{label}: recall@{row['k']} {row['recall_at_k']} vs {before['recall_at_k']}")
+    return problems
+
+
+def _print_table(results: list[dict]):
+    columns = list(results[0])
+    widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in results:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the policy retriever offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(default_sizes))
+    parser.add_argument("--configs", nargs="+", default=list(default_configs), help="<exact|ivf>/<float32|float16|int8>")
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, help="IVF lists scanned per query (default: the index's own)")
+    parser.add_argument("--faq", help="also benchmark this local FAQ markdown file")
+    parser.add_argument("--recording", help="replay FAQ embeddings from this .npz recording instead of faking them")
+    parser.add_argument("--record", action="store_true", help="fill missing recorded embeddings from OpenAI (needs OPENAI_API_KEY)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--check", help="baseline results to compare against; exits 1 on a regression")
+    parser.add_argument("--latency-tolerance", type=float, default=1.5, help="allowed p99 latency ratio")
+    parser.add_argument("--recall-tolerance", type=float, default=0.02, help="allowed recall drop")
+    args = parser.parse_args(argv)
+
+    results = []
+    index_options = {"n_probe": args.n_probe} if args.n_probe else None
+    fake = FakeEmbeddingClient(args.dims)
+    for size in args.sizes:
+        docs, vectors, queries = synthetic_corpus(fake, size, n_queries=args.queries)
+        for config in args.configs:
+            results.append(run_case(f"synthetic-{size}", docs, vectors, queries, fake, config, args.k, index_options))
+            print(results[-1], file=sys.stderr)
+
+    if args.faq:
+        with open(args.faq) as f:
+            docs = split_faq(f)
+        client = fake
+        if args.recording:
+            import openai
+
+            client = RecordedEmbeddingClient(args.recording, openai.Client() if args.record else None)
+        vectors = np.asarray(
+            [emb.embedding for emb in client.embeddings.create(model="text-embedding-3-small", input=[doc["page_content"] for doc in docs]).data],
+            dtype=np.float32,
+        )
+        # Section texts make realistic questions for the FAQ: the first words of each chunk body.
+        queries = [" ".join(doc["page_content"].split("\n", 1)[-1].split()[:8]) for doc in docs]
+        for config in args.configs:
+            results.append(run_case("faq", docs, vectors, queries, client, config, min(args.k, len(docs)), index_options))
+        if args.record:
+            client.save()
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.check:
+        with open(args.check) as f:
+            problems = check(results, json.load(f), args.latency_tolerance, args.recall_tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
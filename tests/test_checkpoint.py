@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import Annotated
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from app.travel_agent.checkpoint import SQLiteCheckpointSaver, compressed_suffix
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def _respond(state: State) -> dict:
+    turn = len(state["messages"])
+    return {"messages": [AIMessage(content=f"answer {turn} " + "detail " * 40, id=f"ai-{turn}")]}
+
+
+def _graph(checkpointer):
+    builder = StateGraph(State)
+    builder.add_node("respond", _respond)
+    builder.add_edge(START, "respond")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _chat(graph, thread_id: str, turns: range):
+    config = {"configurable": {"thread_id": thread_id}}
+    for turn in turns:
+        graph.invoke({"messages": [HumanMessage(content=f"question {turn}", id=f"human-{turn}")]}, config)
+
+
+def _history(graph, thread_id: str) -> list[tuple]:
+    """Values, next nodes and step of every checkpoint of the thread, newest first."""
+    config = {"configurable": {"thread_id": thread_id}}
+    return [(s.values, s.next, s.metadata["step"]) for s in graph.get_state_history(config)]
+
+
+class SQLiteCheckpointSaverTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "checkpoints.sqlite")
+
+    def _saver(self, **options) -> SQLiteCheckpointSaver:
+        saver = SQLiteCheckpointSaver(self.path, compact_interval=0, **options)
+        self.addCleanup(saver.close)
+        return saver
+
+    def _rows(self) -> list[tuple]:
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, depth, keyframe_id, type "
+                "FROM checkpoints ORDER BY checkpoint_id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def test_deltas_and_keyframes_rebuild_the_same_states(self):
+        saver, memory = self._saver(keep_last=100, keyframe_interval=4), MemorySaver()
+        graph, reference = _graph(saver), _graph(memory)
+        _chat(graph, "t", range(6))
+        _chat(reference, "t", range(6))
+
+        self.assertEqual(_history(graph, "t"), _history(reference, "t"))
+        rows = self._rows()
+        self.assertEqual(len(rows), len(_history(reference, "t")))
+        # Chains start with a keyframe and never grow past keyframe_interval checkpoints.
+        self.assertEqual(rows[0][2], 0)
+        self.assertEqual(max(depth for _, _, depth, _, _ in rows), 3)
+        for checkpoint_id, parent_id, depth, keyframe_id, _ in rows:
+            if depth == 0:
+                self.assertEqual(keyframe_id, checkpoint_id)
+            else:
+                parent = next(row for row in rows if row[0] == parent_id)
+                self.assertEqual((parent[2] + 1, parent[3]), (depth, keyframe_id))
+        self.assertGreater(saver.stats()["delta_puts"], 0)
+
+    def test_payloads_are_zlib_compressed(self):
+        saver = self._saver(keep_last=100)
+        _chat(_graph(saver), "t", range(4))
+
+        self.assertTrue(all(row[4].endswith(compressed_suffix) for row in self._rows()))
+        stats = saver.stats()
+        self.assertGreater(stats["compression_ratio"], 1.0)
+        self.assertLess(stats["stored_bytes"], stats["encoded_bytes"])
+
+    def test_compaction_drops_idle_threads_only(self):
+        saver, memory = self._saver(ttl_seconds=3600), MemorySaver()
+        graph, reference = _graph(saver), _graph(memory)
+        for thread_id in ("idle", "active"):
+            _chat(graph, thread_id, range(2))
+            _chat(reference, thread_id, range(2))
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE threads SET last_used = last_used - 7200 WHERE thread_id = 'idle'")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(saver.compact(), 1)
+        self.assertEqual(_history(graph, "idle"), [])
+        self.assertEqual(_history(graph, "active"), _history(reference, "active"))
+        self.assertEqual(saver.compact(), 0)
+
+    def test_keep_last_prunes_old_checkpoints_but_keeps_the_latest_state(self):
+        saver, memory = self._saver(keep_last=4, keyframe_interval=3), MemorySaver()
+        graph, reference = _graph(saver), _graph(memory)
+        _chat(graph, "t", range(8))
+        _chat(reference, "t", range(8))
+
+        history, expected = _history(graph, "t"), _history(reference, "t")
+        self.assertLess(len(history), len(expected))
+        self.assertEqual(history, expected[:len(history)])
+
+    def test_pruning_keeps_the_chains_of_forked_branches(self):
+        saver, memory = self._saver(keep_last=4, keyframe_interval=3), MemorySaver()
+        branches = {}
+        for name, graph in (("sqlite", _graph(saver)), ("memory", _graph(memory))):
+            _chat(graph, "t", range(3))
+            history = list(graph.get_state_history({"configurable": {"thread_id": "t"}}))
+            main, fork_point = history[0].config, history[4].config
+            # Resuming from an older checkpoint starts a branch that shares its keyframe.
+            fork = graph.invoke({"messages": [HumanMessage(content="other question", id="human-fork")]}, fork_point)
+            fork_tip = graph.get_state({"configurable": {"thread_id": "t"}}).config
+            graph.invoke({"messages": [HumanMessage(content="question 3", id="human-3")]}, main)
+            main_tip = graph.get_state({"configurable": {"thread_id": "t"}}).config
+            branches[name] = (graph, fork, fork_tip, main_tip)
+
+        graph, fork, fork_tip, main_tip = branches["sqlite"]
+        reference, expected_fork, reference_fork_tip, reference_main_tip = branches["memory"]
+        self.assertEqual(fork["messages"], expected_fork["messages"])
+        for restarted in (False, True):
+            with self.subTest(restarted=restarted):
+                if restarted:
+                    saver.close()
+                    graph = _graph(self._saver(keep_last=4, keyframe_interval=3))
+                self.assertEqual(graph.get_state(fork_tip).values, reference.get_state(reference_fork_tip).values)
+                self.assertEqual(graph.get_state(main_tip).values, reference.get_state(reference_main_tip).values)
+                self.assertIn("human-fork", [m.id for m in graph.get_state(fork_tip).values["messages"]])
+                # Every checkpoint that was kept, on either branch, can still be rebuilt.
+                expected = _history(reference, "t")
+                history = _history(graph, "t")
+                self.assertGreaterEqual(len(history), 4)
+                for state in history:
+                    self.assertIn(state, expected)
+
+    def test_state_survives_a_restart(self):
+        saver, memory = self._saver(keep_last=100, keyframe_interval=4), MemorySaver()
+        _chat(_graph(saver), "t", range(5))
+        reference = _graph(memory)
+        _chat(reference, "t", range(5))
+        saver.close()
+
+        # A new saver has no cached states, so every read decodes its chain from the file.
+        restarted = _graph(self._saver(keep_last=100, keyframe_interval=4))
+        self.assertEqual(_history(restarted, "t"), _history(reference, "t"))
+        _chat(restarted, "t", range(5, 7))
+        _chat(reference, "t", range(5, 7))
+        self.assertEqual(_history(restarted, "t"), _history(reference, "t"))
+
+
+if __name__ == "__main__":
+    unittest.main()
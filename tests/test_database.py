@@ -0,0 +1,75 @@
+import sqlite3
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.travel_agent.tools.database import rebase_dates
+
+
+def _travel_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(
+        """
+        CREATE TABLE flights (flight_id INTEGER, scheduled_departure TEXT, scheduled_arrival TEXT,
+                              actual_departure TEXT, actual_arrival TEXT);
+        CREATE TABLE bookings (book_ref TEXT, book_date TEXT);
+        CREATE TABLE hotels (id INTEGER, checkin_date TEXT, checkout_date TEXT);
+        CREATE TABLE car_rentals (id INTEGER, start_date TEXT, end_date TEXT);
+        INSERT INTO flights VALUES (1, '2024-04-30 10:00:00-04:00', '2024-04-30 12:00:00-04:00',
+                                    '2024-04-30 10:05:00-04:00', '\\N');
+        INSERT INTO bookings VALUES ('A', '2024-04-20 08:00:00.000000-04:00');
+        INSERT INTO hotels VALUES (1, '2024-05-01', '2024-05-03');
+        INSERT INTO car_rentals VALUES (1, '2024-05-01', '2024-05-03');
+        """
+    )
+    return conn
+
+
+def _departure(conn) -> datetime:
+    (value,) = conn.execute("SELECT scheduled_departure FROM flights").fetchone()
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f%z")
+
+
+class RebaseDatesTest(unittest.TestCase):
+    def test_repeated_small_rebases_move_dates_with_the_flights(self):
+        conn = _travel_db()
+        # The latest actual departure is 14:05 UTC on 2024-04-30; rebase it to noon ten days later.
+        start = datetime(2024, 5, 10, 12, 0, tzinfo=timezone.utc)
+        rebase_dates(conn, start)
+        first_departure = _departure(conn)
+        first_checkin = conn.execute("SELECT checkin_date FROM hotels").fetchone()[0]
+
+        # Eight incremental 6-hour rebases add up to two days.
+        for step in range(1, 9):
+            shifts = rebase_dates(conn, start + timedelta(hours=6 * step))
+            self.assertEqual(shifts["hotels"], 6 * 3600)
+
+        self.assertEqual(_departure(conn) - first_departure, timedelta(days=2))
+        checkin = conn.execute("SELECT checkin_date FROM hotels").fetchone()[0]
+        self.assertEqual(
+            datetime.fromisoformat(checkin) - datetime.fromisoformat(first_checkin), timedelta(days=2)
+        )
+        self.assertEqual(conn.execute("SELECT start_date FROM car_rentals").fetchone()[0], checkin)
+
+        # A single rebase over the same total moves the dates to the same days.
+        fresh = _travel_db()
+        rebase_dates(fresh, start + timedelta(hours=48))
+        for table, column in (("hotels", "checkin_date"), ("car_rentals", "end_date"), ("flights", "scheduled_departure")):
+            query = f"SELECT {column} FROM {table}"
+            self.assertEqual(conn.execute(query).fetchone(), fresh.execute(query).fetchone(), table)
+        recorded = dict(conn.execute("SELECT table_name, shift_seconds FROM date_rebase").fetchall())
+        self.assertEqual(recorded, dict(fresh.execute("SELECT table_name, shift_seconds FROM date_rebase").fetchall()))
+
+    def test_small_shift_is_applied_to_dates_once_it_crosses_a_day(self):
+        conn = _travel_db()
+        start = datetime(2024, 5, 10, 14, 5, tzinfo=timezone.utc)
+        rebase_dates(conn, start)
+        checkin = conn.execute("SELECT checkin_date FROM hotels").fetchone()[0]
+        rebase_dates(conn, start + timedelta(hours=20))
+        self.assertEqual(conn.execute("SELECT checkin_date FROM hotels").fetchone()[0], checkin)
+        rebase_dates(conn, start + timedelta(hours=25))
+        moved = conn.execute("SELECT checkin_date FROM hotels").fetchone()[0]
+        self.assertEqual(datetime.fromisoformat(moved) - datetime.fromisoformat(checkin), timedelta(days=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
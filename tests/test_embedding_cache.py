@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.travel_agent.tools.embedding_cache import EmbeddingCache
+
+
+def _lookup(cache: EmbeddingCache, query: str) -> list[tuple[int, float]]:
+    """The retriever's order of lookups: results first, the embedding only when they miss."""
+    results = cache.get_results("model", "corpus", query, 2)
+    if results is None:
+        if cache.get_embedding("model", query) is None:
+            cache.put_embedding("model", query, np.ones(4, dtype=np.float32))
+        results = [(0, 0.9), (1, 0.5)]
+        cache.put_results("model", "corpus", query, 2, results)
+    return results
+
+
+class EmbeddingCacheStatsTest(unittest.TestCase):
+    def test_each_kind_counts_its_own_lookups(self):
+        cache = EmbeddingCache()
+        for query in ("baggage", "refunds", "pets"):
+            _lookup(cache, query)
+
+        stats = cache.stats()
+        self.assertEqual(stats["results"]["misses"], 3)
+        self.assertEqual(stats["embedding"]["misses"], 3)
+        self.assertEqual((stats["results"]["puts"], stats["embedding"]["puts"]), (3, 3))
+
+        for query in ("Baggage?", "refunds", "pets", "pets"):
+            _lookup(cache, query)
+
+        stats = cache.stats()
+        self.assertEqual((stats["results"]["memory_hits"], stats["results"]["misses"]), (4, 3))
+        self.assertEqual(stats["results"]["hit_rate"], 4 / 7)
+        self.assertEqual(stats["embedding"]["memory_hits"] + stats["embedding"]["misses"], 3)
+        self.assertEqual(stats["entries"], 6)
+
+    def test_disk_tier_is_shared_between_caches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            _lookup(EmbeddingCache(path=path), "baggage")
+
+            cache = EmbeddingCache(path=path)
+            self.assertEqual(_lookup(cache, "baggage"), [(0, 0.9), (1, 0.5)])
+            stats = cache.stats()
+            self.assertEqual((stats["results"]["disk_hits"], stats["results"]["misses"]), (1, 0))
+            self.assertEqual(stats["embedding"]["hit_rate"], 0.0)
+            cache._disk.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
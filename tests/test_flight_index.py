@@ -0,0 +1,134 @@
+import sqlite3
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app.travel_agent.tools import flights
+from app.travel_agent.tools.flight_index import FlightIndex
+from app.travel_agent.tools.migrations import migrate
+
+airports = ["BSL", "CDG", "SHA", "ZRH"]
+
+
+def _flights_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(
+        """
+        CREATE TABLE flights (flight_id INTEGER PRIMARY KEY, flight_no TEXT, scheduled_departure TEXT,
+                              scheduled_arrival TEXT, departure_airport TEXT, arrival_airport TEXT,
+                              status TEXT, aircraft_code TEXT, actual_departure TEXT, actual_arrival TEXT);
+        CREATE TABLE tickets (ticket_no TEXT, book_ref TEXT, passenger_id TEXT);
+        CREATE TABLE ticket_flights (ticket_no TEXT, flight_id INTEGER, fare_conditions TEXT, amount REAL);
+        CREATE TABLE boarding_passes (ticket_no TEXT, flight_id INTEGER, boarding_no INTEGER, seat_no TEXT);
+        CREATE TABLE hotels (id INTEGER, name TEXT, location TEXT, price_tier TEXT, checkin_date TEXT,
+                             checkout_date TEXT, booked INTEGER);
+        CREATE TABLE car_rentals (id INTEGER, name TEXT, location TEXT, price_tier TEXT, start_date TEXT,
+                                  end_date TEXT, booked INTEGER);
+        CREATE TABLE trip_recommendations (id INTEGER, name TEXT, location TEXT, keywords TEXT, details TEXT,
+                                           booked INTEGER);
+        """
+    )
+    rows = []
+    for flight_id in range(1, 61):
+        departure = airports[flight_id % 4]
+        arrival = airports[(flight_id // 4 + flight_id + 1) % 4]
+        day, hour = 1 + flight_id % 5, flight_id % 24
+        rows.append(
+            (
+                flight_id,
+                f"LX{flight_id:04d}",
+                f"2024-05-0{day} {hour:02d}:15:00.000000-04:00",
+                f"2024-05-0{day} {hour:02d}:55:00.000000-04:00",
+                departure,
+                arrival,
+                "Scheduled",
+            )
+        )
+    conn.executemany(
+        "INSERT INTO flights (flight_id, flight_no, scheduled_departure, scheduled_arrival, "
+        "departure_airport, arrival_airport, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    migrate(conn)
+    return conn
+
+
+def _fetch_all(conn):
+    def fetch_all(query, params=()):
+        cursor = conn.execute(query, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    return fetch_all
+
+
+class FlightIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = _flights_db()
+        self.index = FlightIndex(max_staleness=0.0)
+        patches = [
+            mock.patch("app.travel_agent.tools.flight_index.connection", lambda: self.conn),
+            mock.patch.object(flights, "fetch_all", _fetch_all(self.conn)),
+            mock.patch.object(flights, "FLIGHT_INDEX", False),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _assert_matches_sql(self):
+        searches = [
+            {},
+            {"departure_airport": "CDG"},
+            {"arrival_airport": "BSL"},
+            {"departure_airport": "ZRH", "arrival_airport": "SHA"},
+            {"start_time": datetime(2024, 5, 2, 12), "end_time": datetime(2024, 5, 4, 6)},
+            {"departure_airport": "BSL", "start_time": datetime(2024, 5, 3)},
+            {"arrival_airport": "CDG", "end_time": datetime(2024, 5, 2, 23, 15)},
+        ]
+        for search in searches:
+            with self.subTest(**{key: str(value) for key, value in search.items()}):
+                expected = flights.search_flights.invoke({**search, "limit": 1000})
+                found = self.index.search(limit=1000, **search)
+                self.assertEqual(
+                    sorted(row["flight_id"] for row in found),
+                    sorted(row["flight_id"] for row in expected),
+                )
+                self.assertEqual(found, sorted(found, key=lambda row: row["scheduled_departure"]))
+                by_id = {row["flight_id"]: row for row in expected}
+                for row in found:
+                    self.assertEqual(row, by_id[row["flight_id"]])
+
+    def test_search_matches_sql(self):
+        self._assert_matches_sql()
+
+    def test_search_matches_sql_after_flight_updates(self):
+        self._assert_matches_sql()
+        self.conn.execute(
+            "UPDATE flights SET scheduled_departure = '2024-05-03 22:40:00.000000-04:00', "
+            "arrival_airport = 'SHA' WHERE flight_id = 8"
+        )
+        self.conn.execute("UPDATE flights SET status = 'Delayed' WHERE flight_id = 13")
+        self.conn.execute("DELETE FROM flights WHERE flight_id = 21")
+        self.conn.execute(
+            "INSERT INTO flights (flight_id, flight_no, scheduled_departure, scheduled_arrival, "
+            "departure_airport, arrival_airport, status) VALUES "
+            "(61, 'LX0061', '2024-05-02 12:00:00.000000-04:00', '2024-05-02 13:00:00.000000-04:00', "
+            "'CDG', 'BSL', 'Scheduled')"
+        )
+        self._assert_matches_sql()
+        ids = [row["flight_id"] for row in self.index.search(limit=1000)]
+        self.assertIn(61, ids)
+        self.assertNotIn(21, ids)
+
+    def test_a_shift_of_every_flight_triggers_a_rebuild(self):
+        self._assert_matches_sql()
+        self.conn.execute(
+            "UPDATE flights SET scheduled_departure = "
+            "strftime('%Y-%m-%d %H:%M:%S', substr(scheduled_departure, 1, 19), '+90 minutes') || "
+            "substr(scheduled_departure, 20)"
+        )
+        self._assert_matches_sql()
+
+
+if __name__ == "__main__":
+    unittest.main()
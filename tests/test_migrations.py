@@ -0,0 +1,90 @@
+import sqlite3
+import unittest
+
+from app.travel_agent.tools.migrations import _itinerary_select, latest_version, migrate, schema_version
+
+schema = """
+CREATE TABLE flights (flight_id INTEGER PRIMARY KEY, flight_no TEXT, scheduled_departure TEXT,
+                      scheduled_arrival TEXT, departure_airport TEXT, arrival_airport TEXT, status TEXT,
+                      aircraft_code TEXT, actual_departure TEXT, actual_arrival TEXT);
+CREATE TABLE tickets (ticket_no TEXT, book_ref TEXT, passenger_id TEXT);
+CREATE TABLE ticket_flights (ticket_no TEXT, flight_id INTEGER, fare_conditions TEXT, amount REAL);
+CREATE TABLE boarding_passes (ticket_no TEXT, flight_id INTEGER, boarding_no INTEGER, seat_no TEXT);
+CREATE TABLE hotels (id INTEGER, name TEXT, location TEXT, price_tier TEXT, checkin_date TEXT,
+                     checkout_date TEXT, booked INTEGER);
+CREATE TABLE car_rentals (id INTEGER, name TEXT, location TEXT, price_tier TEXT, start_date TEXT,
+                          end_date TEXT, booked INTEGER);
+CREATE TABLE trip_recommendations (id INTEGER, name TEXT, location TEXT, keywords TEXT, details TEXT,
+                                   booked INTEGER);
+INSERT INTO flights VALUES
+    (1, 'LX0112', '2024-05-01 10:00:00-04:00', '2024-05-01 12:00:00-04:00', 'CDG', 'BSL', 'Scheduled', 'SU9', NULL, NULL),
+    (2, 'LX0114', '2024-05-02 10:00:00-04:00', '2024-05-02 12:00:00-04:00', 'BSL', 'CDG', 'Scheduled', 'SU9', NULL, NULL),
+    (3, 'LX0116', '2024-05-03 10:00:00-04:00', '2024-05-03 12:00:00-04:00', 'CDG', 'BSL', 'Scheduled', 'SU9', NULL, NULL);
+INSERT INTO tickets VALUES ('T1', 'B1', 'P1');
+INSERT INTO ticket_flights VALUES ('T1', 1, 'Economy', 100), ('T1', 2, 'Economy', 100);
+INSERT INTO boarding_passes VALUES ('T1', 1, 1, '12A'), ('T1', 2, 1, '14C');
+"""
+
+
+def _migrated_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.executescript(schema)
+    migrate(conn)
+    return conn
+
+
+def _itinerary(conn) -> list[tuple]:
+    return conn.execute("SELECT * FROM passenger_itinerary ORDER BY ticket_no, flight_id").fetchall()
+
+
+def _joined(conn) -> list[tuple]:
+    """What the trigger-maintained table must hold: the join it replaced."""
+    return conn.execute(f"{_itinerary_select} ORDER BY t.ticket_no, f.flight_id").fetchall()
+
+
+class ItineraryTriggersTest(unittest.TestCase):
+    def test_migrate_builds_the_itinerary_and_is_idempotent(self):
+        conn = _migrated_db()
+        self.assertEqual(schema_version(conn), latest_version)
+        self.assertEqual(len(_itinerary(conn)), 2)
+        self.assertEqual(_itinerary(conn), _joined(conn))
+        self.assertEqual(migrate(conn), latest_version)
+
+    def test_ticket_changes_keep_the_itinerary_in_sync(self):
+        conn = _migrated_db()
+        steps = [
+            # a new ticket with one leg and its boarding pass
+            "INSERT INTO tickets VALUES ('T2', 'B2', 'P2')",
+            "INSERT INTO ticket_flights VALUES ('T2', 3, 'Business', 300)",
+            "INSERT INTO boarding_passes VALUES ('T2', 3, 1, '2A')",
+            # rebooking a leg, as update_ticket_to_new_flight does
+            "UPDATE ticket_flights SET flight_id = 3 WHERE ticket_no = 'T1' AND flight_id = 2",
+            "UPDATE boarding_passes SET flight_id = 3 WHERE ticket_no = 'T1' AND flight_id = 2",
+            # a seat change and a ticket moving to another passenger
+            "UPDATE boarding_passes SET seat_no = '1A' WHERE ticket_no = 'T1' AND flight_id = 1",
+            "UPDATE tickets SET passenger_id = 'P3' WHERE ticket_no = 'T2'",
+            # flight data copied onto the rows that reference it
+            "UPDATE flights SET scheduled_departure = '2024-05-03 11:00:00-04:00' WHERE flight_id = 3",
+            # cancelling, as cancel_ticket does
+            "DELETE FROM ticket_flights WHERE ticket_no = 'T2'",
+        ]
+        for statement in steps:
+            with self.subTest(statement=statement):
+                conn.execute(statement)
+                self.assertEqual(_itinerary(conn), _joined(conn))
+
+        rows = {(row[0], row[3]): row for row in _itinerary(conn)}
+        self.assertEqual(set(rows), {("P1", 1), ("P1", 3)})
+        self.assertEqual(rows["P1", 1][9], "1A")
+        self.assertEqual(rows["P1", 3][7], "2024-05-03 11:00:00-04:00")
+
+    def test_deleting_a_ticket_or_flight_drops_its_rows(self):
+        conn = _migrated_db()
+        conn.execute("DELETE FROM flights WHERE flight_id = 2")
+        self.assertEqual([row[3] for row in _itinerary(conn)], [1])
+        conn.execute("DELETE FROM tickets WHERE ticket_no = 'T1'")
+        self.assertEqual(_itinerary(conn), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.travel_agent.prompt_cache import PromptCacheStats
+from app.travel_agent.prompts import (book_car_rental_prompt, book_excursion_prompt, book_hotel_prompt,
+                                      flight_booking_prompt, primary_assistant_prompt)
+
+assistant_prompts = {
+    "primary": primary_assistant_prompt,
+    "flight": flight_booking_prompt,
+    "hotel": book_hotel_prompt,
+    "car_rental": book_car_rental_prompt,
+    "excursion": book_excursion_prompt,
+}
+
+
+def _response(input_tokens: int, cache_read: int = 0, cache_creation: int = 0) -> AIMessage:
+    """An AIMessage carrying the usage ChatAnthropic reports for a response."""
+    return AIMessage(
+        content="ok",
+        usage_metadata={
+            "input_tokens": input_tokens + cache_read + cache_creation,
+            "output_tokens": 5,
+            "total_tokens": input_tokens + cache_read + cache_creation + 5,
+            "input_token_details": {"cache_read": cache_read, "cache_creation": cache_creation},
+        },
+    )
+
+
+class PromptCacheStatsTest(unittest.TestCase):
+    def test_counts_hits_writes_and_misses(self):
+        stats = PromptCacheStats()
+        responses = [
+            _response(100, cache_creation=1500),
+            _response(120, cache_read=1500),
+            _response(90, cache_read=1500),
+            _response(300),
+        ]
+        stats.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)] for message in responses]))
+
+        counters = stats.stats()
+        self.assertEqual(
+            {key: counters[key] for key in ("calls", "hits", "writes", "misses")},
+            {"calls": 4, "hits": 2, "writes": 1, "misses": 1},
+        )
+        self.assertEqual(counters["input_tokens"], 1600 + 1620 + 1590 + 300)
+        self.assertEqual(counters["cache_read_tokens"], 3000)
+        self.assertEqual(counters["cache_creation_tokens"], 1500)
+        self.assertEqual(counters["saved_tokens"], 3000)
+        self.assertEqual(counters["hit_rate"], 0.5)
+
+    def test_raw_anthropic_usage_counts_cached_tokens_as_input(self):
+        stats = PromptCacheStats()
+        stats.record(
+            AIMessage(
+                content="ok",
+                response_metadata={
+                    "usage": {"input_tokens": 40, "cache_read_input_tokens": 1000, "cache_creation_input_tokens": 0}
+                },
+            )
+        )
+        stats.record(AIMessage(content="no usage"))
+
+        counters = stats.stats()
+        self.assertEqual((counters["calls"], counters["hits"]), (1, 1))
+        self.assertEqual(counters["input_tokens"], 1040)
+
+
+class AssistantPromptLayoutTest(unittest.TestCase):
+    def test_static_block_is_cached_and_per_call_values_follow_it(self):
+        for name, prompt in assistant_prompts.items():
+            with self.subTest(prompt=name):
+                messages = prompt.format_messages(messages=[HumanMessage(content="hi")], user_info="ticket 7240005432906569")
+                static, dynamic = messages[0], messages[1]
+
+                self.assertIsInstance(static, SystemMessage)
+                self.assertEqual(len(static.content), 1)
+                self.assertEqual(static.content[0]["cache_control"], {"type": "ephemeral"})
+
+                self.assertIsInstance(dynamic, SystemMessage)
+                self.assertIsInstance(dynamic.content, str)
+                self.assertIn("Current time:", dynamic.content)
+                if "user_info" in prompt.input_variables:
+                    self.assertIn("ticket 7240005432906569", dynamic.content)
+                self.assertNotIn("7240005432906569", static.content[0]["text"])
+                self.assertIsInstance(messages[2], HumanMessage)
+
+    def test_static_block_does_not_change_between_calls(self):
+        for name, prompt in assistant_prompts.items():
+            with self.subTest(prompt=name):
+                first = prompt.format_messages(messages=[], user_info="a")[0]
+                second = prompt.format_messages(messages=[], user_info="b")[0]
+                self.assertEqual(first.content, second.content)
+
+
+if __name__ == "__main__":
+    unittest.main()
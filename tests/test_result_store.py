@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.travel_agent.tools.result_store import ResultStore, fetch_tool_result
+from app.travel_agent.utilities import offload_large_results
+
+rows = [{"flight_id": i, "flight_no": f"LX{i:04d}", "status": "Scheduled"} for i in range(100)]
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "results.sqlite")
+        self.store = ResultStore(self.path, max_inline_chars=200)
+        self.addCleanup(self.store._db.close)
+        for module in ("app.travel_agent.tools.result_store", "app.travel_agent.utilities"):
+            patch = mock.patch(f"{module}.get_result_store", lambda: self.store)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _offload(self, thread_id: str) -> str:
+        message = ToolMessage(content=json.dumps(rows), name="search_flights", tool_call_id="call-1")
+        output = RunnableLambda(offload_large_results).invoke({"messages": [message]}, _config(thread_id))
+        return json.loads(output["messages"][0].content)["handle"]
+
+    def test_handles_only_resolve_in_their_own_thread(self):
+        handle = self._offload("thread-a")
+
+        found = fetch_tool_result.invoke({"handle": handle, "offset": 10, "limit": 2}, _config("thread-a"))
+        self.assertEqual(found["total"], 100)
+        self.assertEqual([row[0] for row in found["rows"]], [10, 11])
+        with self.assertRaisesRegex(ValueError, "No stored result"):
+            fetch_tool_result.invoke({"handle": handle}, _config("thread-b"))
+        with self.assertRaisesRegex(ValueError, "No stored result"):
+            fetch_tool_result.invoke({"handle": handle}, {})
+
+    def test_the_same_result_gets_a_handle_per_thread(self):
+        first, second = self._offload("thread-a"), self._offload("thread-b")
+        self.assertNotEqual(first, second)
+        self.assertEqual(self._offload("thread-a"), first)
+        self.assertEqual(self.store.fetch(second, thread_id="thread-b")["total"], 100)
+
+    def test_a_table_without_threads_is_upgraded(self):
+        conn = sqlite3.connect(os.path.join(os.path.dirname(self.path), "old.sqlite"))
+        conn.execute("CREATE TABLE tool_results (handle TEXT PRIMARY KEY, tool TEXT NOT NULL, "
+                     "payload BLOB NOT NULL, created_at REAL NOT NULL)")
+        conn.close()
+
+        store = ResultStore(os.path.join(os.path.dirname(self.path), "old.sqlite"))
+        self.addCleanup(store._db.close)
+        handle = store.put("search_flights", json.dumps(rows), "thread-a")
+        self.assertIsNotNone(store.get(handle, "thread-a"))
+        self.assertIsNone(store.get(handle, "thread-b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import hashlib
+import importlib.util
+import os
+import re
+import tempfile
+import unittest
+
+import numpy as np
+
+if importlib.util.find_spec("streamlit") is not None:
+    from app.travel_agent.tools.faq_index import build_faq_index, vectors_name
+    from app.travel_agent.tools.retriever import VectorStoreRetriever, retrieval_modes
+else:
+    VectorStoreRetriever = retrieval_modes = None
+
+dims = 64
+topics = ["Booking", "Baggage", "Refund", "Changing flights", "Cancellation", "Invoice", "Seats", "Meals", "Pets"]
+
+
+def _embedding(text: str) -> list[float]:
+    """Deterministic bag-of-words vector, so related texts point the same way."""
+    vector = np.zeros(dims)
+    for word in re.findall(r"\w+", text.lower()):
+        digest = int(hashlib.md5(word.encode()).hexdigest(), 16)
+        vector[digest % dims] += 1 if (digest >> 8) & 1 else -1
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class _Embedding:
+    def __init__(self, embedding):
+        self.embedding = embedding
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.inputs: list[str] = []
+
+    def create(self, model, input):
+        self.inputs.extend(input)
+        return _Response([_Embedding(_embedding(text)) for text in input])
+
+
+class FakeClient:
+    """Stands in for ``openai.Client``; only embeddings are used."""
+
+    def __init__(self):
+        self.embeddings = FakeEmbeddings()
+
+
+def _docs(names=topics) -> list[dict]:
+    return [
+        {"id": name.lower(), "page_content": f"## {name}\n" + f"Text about {name.lower()} policy. " * 3}
+        for name in names
+    ]
+
+
+@unittest.skipIf(VectorStoreRetriever is None, "streamlit is not installed")
+class EmptyStoreTest(unittest.TestCase):
+    def test_every_mode_answers_an_empty_store(self):
+        for mode in retrieval_modes:
+            with self.subTest(mode=mode):
+                client = FakeClient()
+                retriever = VectorStoreRetriever([], np.empty((0, dims), dtype=np.float32), client, mode=mode)
+                self.assertEqual(retriever.query_many(["pets", "refund"], 3), [[], []])
+                self.assertEqual(client.embeddings.inputs, [])
+
+    def test_every_mode_answers_after_every_doc_is_removed(self):
+        for mode in retrieval_modes:
+            for index in ("exact", "ivf"):
+                with self.subTest(mode=mode, index=index):
+                    retriever = VectorStoreRetriever.from_docs(_docs(), FakeClient(), mode=mode, index=index)
+                    self.assertTrue(retriever.query("pets", 2))
+                    self.assertEqual(retriever.remove_docs([doc["id"] for doc in _docs()]), len(topics))
+                    self.assertEqual(retriever.query_many(["pets", "refund"], 3), [[], []])
+
+
+@unittest.skipIf(VectorStoreRetriever is None, "streamlit is not installed")
+class UpsertTest(unittest.TestCase):
+    def test_queries_see_upserted_docs(self):
+        for mode in retrieval_modes:
+            with self.subTest(mode=mode):
+                client = FakeClient()
+                retriever = VectorStoreRetriever.from_docs(_docs(topics[:-1]), client, mode=mode)
+                self.assertNotIn("pets", [doc["id"] for doc in retriever.query("pets policy", 3)])
+
+                pets = _docs(["Pets"])
+                client.embeddings.inputs.clear()
+                self.assertEqual(retriever.upsert_docs(pets + _docs(["Meals"])), ["pets"])
+                self.assertEqual(client.embeddings.inputs, [pets[0]["page_content"]])
+                self.assertEqual(retriever.query("pets policy", 1)[0]["id"], "pets")
+
+                edited = {"id": "pets", "page_content": "## Animals\nDogs and cats travel in the cabin."}
+                self.assertEqual(retriever.upsert_docs([edited]), ["pets"])
+                found = retriever.query("dogs and cats in the cabin", 3)
+                self.assertEqual(found[0]["page_content"], edited["page_content"])
+                self.assertEqual([doc["id"] for doc in found].count("pets"), 1)
+
+
+@unittest.skipIf(VectorStoreRetriever is None, "streamlit is not installed")
+class LexicalModeTest(unittest.TestCase):
+    def test_sections_without_a_matching_term_are_left_out(self):
+        retriever = VectorStoreRetriever.from_docs(_docs(), FakeClient(), mode="lexical")
+        found = retriever.query("can I bring my pets", 5)
+        self.assertEqual([doc["id"] for doc in found], ["pets"])
+        self.assertTrue(all(doc["similarity"] > 0 for doc in found))
+        self.assertEqual(retriever.query("unrelated words only", 5), [])
+
+
+@unittest.skipIf(VectorStoreRetriever is None, "streamlit is not installed")
+class FaqArtifactTest(unittest.TestCase):
+    def test_quantized_store_keeps_the_artifact_memory_mapped(self):
+        faq = "# FAQ\n" + "".join(f"\n## {name}\nText about {name.lower()} policy.\n" for name in topics)
+        with tempfile.TemporaryDirectory() as path:
+            client = FakeClient()
+            build_faq_index(client, faq, path)
+            retriever = VectorStoreRetriever.from_index(client, path=path, quantize="int8")
+
+            vectors = retriever._store._vectors
+            self.assertIsInstance(vectors, np.memmap)
+            self.assertEqual(vectors.filename, os.path.realpath(os.path.join(path, vectors_name)))
+            self.assertIn("Pets", retriever.query("pets policy", 1)[0]["page_content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
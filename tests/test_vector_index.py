@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from app.travel_agent.tools.vector_index import ExactIndex, IVFIndex, _perturbed, open_index, recall_at_k
+
+
+def _clustered(n: int, dims: int = 64, clusters: int = 40, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dims))
+    rows = centers[rng.integers(clusters, size=n)] + 0.9 * rng.standard_normal((n, dims))
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+class IVFIndexTest(unittest.TestCase):
+    def test_tuned_probe_meets_the_target_on_unseen_queries(self):
+        vectors = _clustered(8000)
+        index = IVFIndex.build(vectors, target_recall=0.9)
+        self.assertLess(index.n_probe, index.n_lists)
+
+        rng = np.random.default_rng(42)
+        queries = _perturbed(vectors[rng.choice(len(vectors), 200, replace=False)], 0.7, rng)
+        expected, _ = ExactIndex(vectors).search(queries, 10)
+        self.assertGreaterEqual(recall_at_k(index.search(queries, 10)[0], expected), 0.85)
+
+    def test_perturbed_queries_keep_their_similarity(self):
+        rows = _clustered(50)
+        queries = _perturbed(rows, 0.7, np.random.default_rng(0))
+        np.testing.assert_allclose(np.linalg.norm(queries, axis=1), 1.0, atol=1e-5)
+        np.testing.assert_allclose(np.sum(queries * rows, axis=1), 0.7, atol=1e-5)
+
+    def test_an_empty_corpus_builds_an_empty_index(self):
+        for quantize in ("float32", "int8"):
+            with self.subTest(quantize=quantize):
+                index = open_index("ivf", np.empty((0, 8), dtype=np.float32), quantize=quantize)
+                ids, scores = index.search(np.ones((2, 8), dtype=np.float32), 3)
+                self.assertTrue((ids == -1).all())
+                self.assertTrue(np.isneginf(scores).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from app.travel_agent.tools.vector_store import DocumentStore
+
+
+def _store(n: int = 12, dims: int = 16, **options) -> tuple[DocumentStore, np.ndarray]:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    docs = [{"id": f"doc{row}", "page_content": f"section {row}"} for row in range(n)]
+    return DocumentStore(docs, vectors, [doc["id"] for doc in docs], **options), vectors
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_snapshot_taken_before_compact_resolves_its_own_rows(self):
+        for options in ({}, {"index": "ivf"}, {"quantize": "int8"}):
+            with self.subTest(**options):
+                store, vectors = _store(**options)
+                snapshot = store.snapshot()
+
+                store.remove([f"doc{row}" for row in range(0, 12, 2)])
+                store.append(["new"], [{"page_content": "new section"}], vectors[7:8])
+                store.compact()
+                self.assertEqual(len(store), 7)
+                self.assertNotEqual(store.snapshot().version, snapshot.version)
+
+                ids, scores = snapshot.search(vectors[[2, 7]], 1)
+                self.assertEqual([snapshot.docs[row]["id"] for row in ids[:, 0]], ["doc2", "doc7"])
+                np.testing.assert_allclose(scores[:, 0], 1.0, atol=1e-2)
+                np.testing.assert_array_equal(snapshot.vectors[2], vectors[2])
+                self.assertTrue(snapshot.alive.all())
+
+                ids, _ = store.search(vectors[[2, 7]], 2)
+                current = store.snapshot().docs
+                self.assertNotIn("doc2", [current[row]["id"] for row in ids[0]])
+                self.assertIn("new section", [current[row]["page_content"] for row in ids[1]])
+
+    def test_removing_every_row_leaves_an_empty_searchable_store(self):
+        store, vectors = _store(index="ivf")
+        store.remove([f"doc{row}" for row in range(12)])
+        self.assertEqual(len(store), 0)
+        ids, _ = store.search(vectors[:2], 3)
+        self.assertTrue((ids == -1).all())
+
+
+if __name__ == "__main__":
+    unittest.main()